@@ -0,0 +1,100 @@
+# ASGI entry point for the async serving mode:
+#
+#     GUNICORN_WORKER_CLASS=uvicorn.workers.UvicornWorker gunicorn -c gunicorn.conf.py
+#
+# GET /livestock, /users, /farmers and /brokers are served by the coroutines
+# in routes/async_routes.py on the worker's event loop, so one worker keeps
+# many of them waiting on Postgres at once. Every other request goes to the
+# Flask app as in wsgi.py, on asgiref's thread pool.
+import io
+import sys
+
+from asgiref.wsgi import WsgiToAsgi
+
+from config.config import async_db, create_app
+from routes.async_routes import ASYNC_VIEWS
+
+
+def build_environ(scope):
+    """A WSGI environ for a bodyless ASGI HTTP request"""
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf8').decode('latin1'),
+        'PATH_INFO': scope['path'].encode('utf8').decode('latin1'),
+        'QUERY_STRING': scope['query_string'].decode('latin1'),
+        'SERVER_PROTOCOL': f"HTTP/{scope['http_version']}",
+        'SERVER_NAME': scope['server'][0] if scope.get('server') else 'localhost',
+        'SERVER_PORT': str(scope['server'][1]) if scope.get('server') else '80',
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    for name, value in scope['headers']:
+        name = name.decode('latin1').upper().replace('-', '_')
+        if name not in ('CONTENT_LENGTH', 'CONTENT_TYPE'):
+            name = f"HTTP_{name}"
+        value = value.decode('latin1')
+        environ[name] = f"{environ[name]},{value}" if name in environ else value
+    return environ
+
+
+class AsyncReads:
+    def __init__(self, flask_app):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+        # Only plain paths are served natively, so a dict lookup finds them
+        self.views = {rule.rule: ASYNC_VIEWS[rule.endpoint] for rule in flask_app.url_map.iter_rules()
+                      if rule.endpoint in ASYNC_VIEWS}
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http' and scope['method'] == 'GET' and scope['path'] in self.views:
+            await self.serve(self.views[scope['path']], scope, send)
+        else:
+            await self.wsgi(scope, receive, send)
+
+    async def serve(self, view, scope, send):
+        """Run `view` the way Flask's full_dispatch_request runs a view"""
+        app = self.flask_app
+        environ = build_environ(scope)
+        with app.request_context(environ):
+            try:
+                try:
+                    rv = app.preprocess_request()
+                    if rv is None:
+                        rv = await view()
+                except Exception as e:
+                    rv = app.handle_user_exception(e)
+                response = app.finalize_request(rv)
+            except Exception as e:
+                response = app.handle_exception(e)
+            finally:
+                await async_db.remove()
+            body, status, headers = response.get_wsgi_response(environ)
+
+        await send({
+            'type': 'http.response.start',
+            'status': int(status.split(' ', 1)[0]),
+            'headers': [(name.lower().encode('latin1'), value.encode('latin1')) for name, value in headers],
+        })
+        await send({'type': 'http.response.body', 'body': b''.join(body)})
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                # Close this worker's asyncpg connections instead of leaving them to time out
+                await async_db.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+
+app = AsyncReads(create_app())
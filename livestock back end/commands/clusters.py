@@ -0,0 +1,14 @@
+import click
+from flask.cli import with_appcontext
+
+from config.config import db
+from utils.clusters import rebuild_clusters
+
+
+@click.command('rebuild-clusters')
+@with_appcontext
+def rebuild_clusters_command():
+    """Recompute the map cluster rollups from the listings table."""
+    rebuild_clusters()
+    db.session.commit()
+    click.echo("Map clusters rebuilt")
@@ -0,0 +1,98 @@
+import csv
+import re
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from config.config import db
+from models.models import Farmer, livestock
+from utils.clusters import rebuild_clusters
+
+# Words that carry no place information in free-text locations
+NOISE_WORDS = {'county', 'town', 'sub', 'ward', 'village', 'kenya', 'near', 'in', 'the', 'of'}
+
+
+def normalize_place(text):
+    """Lowercase, drop apostrophes/punctuation and noise words"""
+    text = re.sub(r"['’]", '', text.lower())
+    words = [w for w in re.split(r'[^a-z0-9]+', text) if w and w not in NOISE_WORDS]
+    return ' '.join(words)
+
+
+def load_gazetteer(path):
+    """Read a name,latitude,longitude CSV into {normalized name: (lat, lon)}"""
+    places = {}
+    with open(path, newline='', encoding='utf-8') as handle:
+        for row in csv.DictReader(handle):
+            places[normalize_place(row['name'])] = (float(row['latitude']), float(row['longitude']))
+    return places
+
+
+def geocode(location, places):
+    """
+    Resolve a free-text location to (lat, lon), or None.
+
+    Tries the whole string, then each comma-separated part, then the longest
+    run of words (up to three) that names a gazetteer place.
+    """
+    if not location:
+        return None
+    candidates = [location] + location.split(',')
+    for candidate in candidates:
+        key = normalize_place(candidate)
+        if key in places:
+            return places[key]
+
+    words = normalize_place(location).split()
+    for size in (3, 2, 1):
+        for start in range(len(words) - size + 1):
+            key = ' '.join(words[start:start + size])
+            if key in places:
+                return places[key]
+    return None
+
+
+def backfill(model, location_col, places, batch_size, overwrite):
+    """Geocode rows of `model` in id order, committing one batch at a time"""
+    matched = missed = 0
+    last_id = 0
+    while True:
+        query = model.query.filter(model.id > last_id)
+        if not overwrite:
+            query = query.filter(model.latitude.is_(None))
+        rows = query.order_by(model.id).limit(batch_size).all()
+        if not rows:
+            break
+        for row in rows:
+            point = geocode(getattr(row, location_col.key), places)
+            if point:
+                row.set_coordinates(*point)
+                matched += 1
+            else:
+                missed += 1
+        last_id = rows[-1].id
+        db.session.commit()
+    return matched, missed
+
+
+@click.command('geocode-backfill')
+@click.option('--gazetteer', 'gazetteer_path', default=None,
+              help='CSV of name,latitude,longitude (defaults to GAZETTEER_PATH).')
+@click.option('--batch-size', default=1000, show_default=True)
+@click.option('--overwrite', is_flag=True, help='Re-geocode rows that already have coordinates.')
+@with_appcontext
+def geocode_backfill(gazetteer_path, batch_size, overwrite):
+    """Fill in latitude/longitude for farmers and listings from their location text."""
+    places = load_gazetteer(gazetteer_path or current_app.config['GAZETTEER_PATH'])
+    click.echo(f"Loaded {len(places)} gazetteer places")
+
+    for label, model, column in (('farmers', Farmer, Farmer.farm_location),
+                                 ('listings', livestock, livestock.location)):
+        matched, missed = backfill(model, column, places, batch_size, overwrite)
+        click.echo(f"{label}: {matched} geocoded, {missed} unmatched")
+
+    # New coordinates change every zoom level, so recompute rather than adjust
+    rebuild_clusters()
+    db.session.commit()
+    click.echo("Map clusters rebuilt")
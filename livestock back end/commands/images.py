@@ -0,0 +1,47 @@
+from concurrent.futures import wait
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from models.models import ImageBlob
+from utils.image_store import collect_garbage, get_variant_executor, schedule_variants
+from utils.resumable import sweep_uploads
+
+
+@click.command('gc-images')
+@click.option('--retention-days', type=int, default=None,
+              help='Release images of listings deleted longer ago than this (defaults to IMAGE_RETENTION_DAYS).')
+@with_appcontext
+def gc_images(retention_days):
+    """Release images of long-deleted listings and remove unreferenced files."""
+    if retention_days is None:
+        retention_days = current_app.config['IMAGE_RETENTION_DAYS']
+    released, deleted = collect_garbage(retention_days, current_app.config['IMAGE_GC_GRACE_SECONDS'])
+    click.echo(f"Released {released} listing images, deleted {deleted} unreferenced files")
+
+
+@click.command('render-variants')
+@with_appcontext
+def render_missing_variants():
+    """Render responsive variants for referenced images that have none yet."""
+    blobs = ImageBlob.query.filter(ImageBlob.variant_widths.is_(None), ImageBlob.ref_count > 0).all()
+    futures = [schedule_variants(blob.sha256, blob.image_type) for blob in blobs]
+    wait(futures)
+    # Done-callbacks record the widths on the pool's management thread;
+    # shutting the pool down joins that thread so none are lost on exit
+    get_variant_executor().shutdown(wait=True)
+    failed = sum(1 for future in futures if future.exception() is not None)
+    click.echo(f"Rendered variants for {len(futures) - failed} images, {failed} failed")
+
+
+@click.command('sweep-uploads')
+@click.option('--max-age', type=int, default=None,
+              help='Remove uploads idle for this many seconds (defaults to RESUMABLE_UPLOAD_EXPIRY).')
+@with_appcontext
+def sweep_partial_uploads(max_age):
+    """Remove abandoned resumable uploads and leftover upload temp files."""
+    if max_age is None:
+        max_age = current_app.config['RESUMABLE_UPLOAD_EXPIRY']
+    removed = sweep_uploads(max_age)
+    click.echo(f"Removed {removed} abandoned upload files")
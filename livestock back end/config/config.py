@@ -1,24 +1,38 @@
 # config/init_app.py
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_marshmallow import Marshmallow
 from flask_cors import CORS
 import os
+import click
 from dotenv import load_dotenv
 from flask_jwt_extended import JWTManager
 from datetime import timedelta
+from utils.async_db import AsyncDatabase
+from utils.cache import ResponseCache
+from utils.json_provider import FastJSONProvider
+from utils.passwords import PasswordHasher
+from utils.pool import dispose_after_fork, engine_options, instrument_engine
+from utils.replicas import ReplicaRouter, RoutingSession, replica_binds
+from utils.uploads import UploadRequest
 
 # Initialize extensions
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 ma = Marshmallow()
 cors = CORS()
 jwt = JWTManager()
+cache = ResponseCache()
+replicas = ReplicaRouter()
+passwords = PasswordHasher()
+async_db = AsyncDatabase()
 
 def create_app():
     # Initialize Flask app
     app = Flask(__name__)
+    # Stream multipart file uploads to disk instead of memory
+    app.request_class = UploadRequest
+    # Encode JSON responses with orjson
+    app.json = FastJSONProvider(app)
 
     # Load environment variables
     load_dotenv()
@@ -34,33 +48,119 @@ def create_app():
 
     app.config['SQLALCHEMY_DATABASE_URI'] = f"postgresql://{DB_CONFIG['user']}:{DB_CONFIG['password']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{DB_CONFIG['dbname']}"
     app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    # Connection pool configurations
+    # Each gunicorn worker holds up to DB_POOL_SIZE + DB_MAX_OVERFLOW connections
+    app.config['DB_POOL_SIZE'] = int(os.getenv('DB_POOL_SIZE', 5))
+    app.config['DB_MAX_OVERFLOW'] = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    app.config['DB_POOL_TIMEOUT'] = int(os.getenv('DB_POOL_TIMEOUT', 30))
+    # Reconnect before the server or a load balancer drops idle connections
+    app.config['DB_POOL_RECYCLE'] = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    app.config['DB_POOL_PRE_PING'] = os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    # Milliseconds, 0 for no limit; it applies to `flask db upgrade` as well
+    app.config['DB_STATEMENT_TIMEOUT'] = int(os.getenv('DB_STATEMENT_TIMEOUT', 0))
+    # true behind PgBouncer (or the Supabase pooler on port 6543) in transaction mode
+    app.config['DB_PGBOUNCER'] = os.getenv('DB_PGBOUNCER', 'false').lower() == 'true'
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+
+    # Read replica configurations
+    # Comma-separated database URIs; GET handlers read from them when set
+    replica_uris = [uri.strip() for uri in os.getenv('DB_REPLICA_URIS', '').split(',') if uri.strip()]
+    app.config['SQLALCHEMY_BINDS'] = replica_binds(replica_uris, app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+    # A user's reads go to the primary for this long after they write (needs CACHE_BACKEND=sqlite)
+    app.config['DB_REPLICA_STICKY_SECONDS'] = int(os.getenv('DB_REPLICA_STICKY_SECONDS', 5))
+    # Replicas further behind than this many seconds are skipped
+    app.config['DB_REPLICA_MAX_LAG'] = float(os.getenv('DB_REPLICA_MAX_LAG', 2))
+    app.config['DB_REPLICA_CHECK_INTERVAL'] = float(os.getenv('DB_REPLICA_CHECK_INTERVAL', 5))
     app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY', 'siri-secret')
 
     # JWT configurations
     app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=1)
     app.config['JWT_REFRESH_TOKEN_EXPIRES'] = timedelta(days=30)
 
+    # Password hashing configurations
+    # Stored hashes with a different cost are upgraded on the user's next login
+    app.config['BCRYPT_ROUNDS'] = int(os.getenv('BCRYPT_ROUNDS', 12))
+    app.config['BCRYPT_WORKERS'] = int(os.getenv('BCRYPT_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+    app.config['BCRYPT_MAX_QUEUE'] = int(os.getenv('BCRYPT_MAX_QUEUE', 32))
+
+    # Pagination configurations
+    app.config['PAGE_SIZE'] = int(os.getenv('PAGE_SIZE', 50))
+    app.config['MAX_PAGE_SIZE'] = int(os.getenv('MAX_PAGE_SIZE', 200))
+
+    # Export and bulk import configurations
+    app.config['EXPORT_BATCH_SIZE'] = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+    app.config['BULK_MAX_ROWS'] = int(os.getenv('BULK_MAX_ROWS', 5000))
+
+    # Geo search configurations
+    app.config['MAX_SEARCH_RADIUS_KM'] = float(os.getenv('MAX_SEARCH_RADIUS_KM', 500))
+    # A 4K screen shows about 60 x 34 cells, so this leaves room for overscan
+    app.config['MAX_CLUSTER_CELLS'] = int(os.getenv('MAX_CLUSTER_CELLS', 4096))
+    app.config['GAZETTEER_PATH'] = os.getenv(
+        'GAZETTEER_PATH', os.path.join(os.path.abspath(os.path.dirname(__file__)), '..', 'data', 'gazetteer.csv')
+    )
+
     # File upload configurations
     base_dir = os.path.abspath(os.path.dirname(__file__))
     app.config['UPLOAD_FOLDER'] = os.path.join(base_dir, '..', 'uploads')
     app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024  # 16MB max file size
     app.config['ALLOWED_EXTENSIONS'] = {'png', 'jpg', 'jpeg', 'gif'}
+    # Images of soft-deleted listings are kept this long in case they are restored
+    app.config['IMAGE_RETENTION_DAYS'] = int(os.getenv('IMAGE_RETENTION_DAYS', 30))
+    app.config['IMAGE_GC_GRACE_SECONDS'] = int(os.getenv('IMAGE_GC_GRACE_SECONDS', 3600))
+    app.config['IMAGE_VARIANT_WIDTHS'] = (160, 320, 640, 1024)
+    # Resumable uploads idle this long are removed by `flask sweep-uploads`
+    app.config['RESUMABLE_UPLOAD_EXPIRY'] = int(os.getenv('RESUMABLE_UPLOAD_EXPIRY', 24 * 60 * 60))
+    app.config['THUMBNAIL_WORKERS'] = int(os.getenv('THUMBNAIL_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+
+    # Image serving configurations
+    # none streams files from Python (sendfile under gunicorn), x-sendfile hands
+    # them to Apache/lighttpd, x-accel to nginx
+    app.config['IMAGE_SENDFILE'] = os.getenv('IMAGE_SENDFILE', 'none')
+    # nginx `internal` location aliased to UPLOAD_FOLDER, used by x-accel
+    app.config['IMAGE_ACCEL_PREFIX'] = os.getenv('IMAGE_ACCEL_PREFIX', '/protected-images/')
+
+    # Response cache configurations
+    app.config['CACHE_BACKEND'] = os.getenv('CACHE_BACKEND', 'memory')  # memory, sqlite or null
+    app.config['CACHE_DEFAULT_TTL'] = int(os.getenv('CACHE_DEFAULT_TTL', 60))
+    app.config['CACHE_MAX_ENTRIES'] = int(os.getenv('CACHE_MAX_ENTRIES', 1024))
+    app.config['CACHE_SQLITE_PATH'] = os.getenv(
+        'CACHE_SQLITE_PATH', os.path.join(base_dir, '..', 'instance', 'response_cache.sqlite3')
+    )
 
     # Ensure upload directory exists
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
     # Initialize extensions with the app
     db.init_app(app)
-    migrate.init_app(app, db)
+    with app.app_context():
+        for engine in db.engines.values():
+            instrument_engine(engine, app.config)
+        dispose_after_fork(db.engines.values())
+    async_db.init_app(app)
+    # `flask db` is the only user of Flask-Migrate, and alembic is slow to import
+    if click.get_current_context(silent=True) is not None:
+        from flask_migrate import Migrate
+        Migrate(app, db)
     ma.init_app(app)
     cors.init_app(app)
     jwt.init_app(app)
+    cache.init_app(app)
+    replicas.init_app(app)
+    passwords.init_app(app)
 
     # Register blueprints
-    from routes import user_routes, farmer_routes, broker_routes
-    from routes.livestock_routes import livestock_bp
-   
+    from routes.init import register_blueprints
+    register_blueprints(app)
 
+    # Register CLI commands
+    from commands.geocode import geocode_backfill
+    from commands.clusters import rebuild_clusters_command
+    from commands.images import gc_images, render_missing_variants, sweep_partial_uploads
+    app.cli.add_command(geocode_backfill)
+    app.cli.add_command(rebuild_clusters_command)
+    app.cli.add_command(gc_images)
+    app.cli.add_command(render_missing_variants)
+    app.cli.add_command(sweep_partial_uploads)
 
-   
     return app
\ No newline at end of file
@@ -0,0 +1,101 @@
+"""
+gunicorn settings for production (gunicorn picks this file up from the
+working directory, or pass -c gunicorn.conf.py).
+
+Every setting can be overridden from the environment, e.g.
+GUNICORN_WORKER_CLASS=sync WEB_CONCURRENCY=9 gunicorn -c gunicorn.conf.py
+
+Zero-downtime reload
+--------------------
+The app is preloaded in the master and workers are forked from it, so
+SIGHUP replaces the workers gracefully with this configuration re-read but
+the same code. To roll out new code without dropping a request, set
+GUNICORN_PIDFILE and:
+
+    kill -USR2 $(cat $GUNICORN_PIDFILE)   # new master ($GUNICORN_PIDFILE.2) and workers on the new code
+    kill -TERM $(cat $GUNICORN_PIDFILE)   # old workers finish their requests, old master exits
+
+Both masters accept on the same listening socket in between, and the new
+master takes over the pidfile once the old one is gone. If the new code
+misbehaves, TERM the new master instead.
+"""
+import multiprocessing
+import os
+
+cpus = multiprocessing.cpu_count()
+
+# Server socket
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', 8000)}")
+backlog = int(os.getenv('GUNICORN_BACKLOG', 2048))
+
+# The app is imported once in the master; workers fork from it and share
+# its memory until they write to it. create_app makes forked workers open
+# their own database connections (dispose_after_fork).
+preload_app = True
+
+# Worker processes
+# gthread: one process per core plus one, each with a few threads; requests
+# mostly wait on Postgres, so threads overlap that wait without more memory.
+# sync: one request per process, 2 x cores + 1 processes.
+# gevent: one process per core holding up to worker_connections clients,
+# with psycopg2 waiting cooperatively (utils/green.py); suits many slow
+# clients, see scripts/bench_slow_clients.py.
+# uvicorn.workers.UvicornWorker: the async serving mode of asgi.py, one
+# event loop per core; see scripts/bench_async.py.
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+wsgi_app = 'asgi:app' if 'uvicorn' in worker_class.lower() else 'wsgi:app'
+if 'gevent' in worker_class:
+    # Patch before the preloaded app imports ssl, threading and the rest, as
+    # gevent requires; workers inherit it (see post_worker_init for psycopg2)
+    from gevent import monkey
+    monkey.patch_all()
+if worker_class == 'sync':
+    default_workers, default_threads = 2 * cpus + 1, 1
+elif worker_class == 'gthread':
+    default_workers, default_threads = cpus + 1, 4
+else:
+    default_workers, default_threads = cpus, 1
+workers = int(os.getenv('WEB_CONCURRENCY', default_workers))
+threads = int(os.getenv('GUNICORN_THREADS', default_threads))
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 100))
+
+# Restart each worker after a while to bound slow leaks; the jitter keeps
+# them from all restarting at once
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 2000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 200))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+# In-flight requests get this long to finish on reload or shutdown
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Needed for the USR2 upgrade above
+pidfile = os.getenv('GUNICORN_PIDFILE')
+
+# Logging
+accesslog = os.getenv('GUNICORN_ACCESSLOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOGLEVEL', 'info')
+
+# Trust X-Forwarded-* only from the proxy in front of us
+forwarded_allow_ips = os.getenv('FORWARDED_ALLOW_IPS', '127.0.0.1')
+
+
+def post_worker_init(worker):
+    # Patching the standard library leaves psycopg2 blocking the worker
+    if 'gevent' in worker_class:
+        from utils.green import patch_worker
+        patch_worker(worker.wsgi)
+
+
+def worker_exit(server, worker):
+    # Close this worker's pooled connections instead of leaving them to time out
+    app = getattr(worker, 'wsgi', None)
+    if app is None:
+        return
+    # asgi.py closes its asyncpg pool itself on lifespan shutdown
+    app = getattr(app, 'flask_app', app)
+    from config.config import db
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
@@ -0,0 +1,36 @@
+"""carry breed (price) in the active listing order index
+
+Revision ID: 0b6e3d9a4f52
+Revises: f3a5c9e27d16
+Create Date: 2026-10-20 09:14:52.308417
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b6e3d9a4f52'
+down_revision = 'f3a5c9e27d16'
+branch_labels = None
+depends_on = None
+
+ACTIVE = sa.text('is_deleted = false')
+
+
+def upgrade():
+    # With seq scans allowed the planner walks (created_at, id) for a price
+    # range and filters breed on every heap row; the breed-only index went
+    # unused. Carrying breed in the order index checks it in the Index Cond.
+    op.create_index('ix_livestock_active_created_at_id_price', 'livestock',
+                    ['created_at', 'id', 'breed'], postgresql_where=ACTIVE)
+    op.drop_index('ix_livestock_active_created_at_id', table_name='livestock')
+    op.drop_index('ix_livestock_active_price', table_name='livestock')
+
+
+def downgrade():
+    op.create_index('ix_livestock_active_price', 'livestock',
+                    ['breed'], postgresql_where=ACTIVE)
+    op.create_index('ix_livestock_active_created_at_id', 'livestock',
+                    ['created_at', 'id'], postgresql_where=ACTIVE)
+    op.drop_index('ix_livestock_active_created_at_id_price', table_name='livestock')
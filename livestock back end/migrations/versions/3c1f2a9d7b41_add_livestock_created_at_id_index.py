@@ -0,0 +1,26 @@
+"""add livestock (created_at, id) index for keyset pagination
+
+Revision ID: 3c1f2a9d7b41
+Revises: ed8b959d4f9c
+Create Date: 2026-10-18 09:12:40.118236
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1f2a9d7b41'
+down_revision = 'ed8b959d4f9c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('livestock', schema=None) as batch_op:
+        batch_op.create_index('ix_livestock_created_at_id', ['created_at', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('livestock', schema=None) as batch_op:
+        batch_op.drop_index('ix_livestock_created_at_id')
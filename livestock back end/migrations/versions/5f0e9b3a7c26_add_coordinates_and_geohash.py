@@ -0,0 +1,40 @@
+"""add latitude, longitude and geohash to farmer and livestock
+
+Revision ID: 5f0e9b3a7c26
+Revises: d2a8f4c61e93
+Create Date: 2026-10-18 13:55:14.602481
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f0e9b3a7c26'
+down_revision = 'd2a8f4c61e93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('farmer', 'livestock'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+            batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+            batch_op.add_column(sa.Column('geohash', sa.String(length=12), nullable=True))
+
+    op.create_index('ix_farmer_geohash', 'farmer', ['geohash'],
+                    postgresql_ops={'geohash': 'varchar_pattern_ops'})
+    op.create_index('ix_livestock_active_geohash', 'livestock', ['geohash'],
+                    postgresql_ops={'geohash': 'varchar_pattern_ops'},
+                    postgresql_where=sa.text('is_deleted = false AND geohash IS NOT NULL'))
+
+
+def downgrade():
+    op.drop_index('ix_livestock_active_geohash', table_name='livestock')
+    op.drop_index('ix_farmer_geohash', table_name='farmer')
+    for table in ('livestock', 'farmer'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('geohash')
+            batch_op.drop_column('longitude')
+            batch_op.drop_column('latitude')
@@ -0,0 +1,54 @@
+"""add table_version counters bumped by statement triggers
+
+Revision ID: 7d1c4e8b2a69
+Revises: 0b6e3d9a4f52
+Create Date: 2026-10-21 11:02:36.184920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d1c4e8b2a69'
+down_revision = '0b6e3d9a4f52'
+branch_labels = None
+depends_on = None
+
+# Tables whose state conditional GETs fingerprint
+TRACKED = ('user', 'farmer', 'broker', 'livestock', 'image_blob')
+
+
+def upgrade():
+    op.create_table('table_version',
+        sa.Column('table_name', sa.String(length=63), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False),
+        sa.Column('changed_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('table_name')
+    )
+    table_version = sa.table('table_version', sa.column('table_name'), sa.column('version'))
+    op.bulk_insert(table_version, [{'table_name': name, 'version': 0} for name in TRACKED])
+
+    # The UPDATE takes the counter row's lock until the writing transaction
+    # ends, so a later writer bumps it only after this one commits and a
+    # reader never sees the version stand still over a committed change.
+    # max(updated_at) did: updated_at is the transaction's start time.
+    op.execute("""
+        CREATE FUNCTION bump_table_version() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE table_version SET version = version + 1, changed_at = clock_timestamp()
+            WHERE table_name = TG_TABLE_NAME;
+            RETURN NULL;
+        END
+        $$
+    """)
+    for name in TRACKED:
+        op.execute(f'CREATE TRIGGER bump_table_version BEFORE INSERT OR UPDATE OR DELETE OR TRUNCATE '
+                   f'ON "{name}" FOR EACH STATEMENT EXECUTE FUNCTION bump_table_version()')
+
+
+def downgrade():
+    for name in TRACKED:
+        op.execute(f'DROP TRIGGER bump_table_version ON "{name}"')
+    op.execute('DROP FUNCTION bump_table_version()')
+    op.drop_table('table_version')
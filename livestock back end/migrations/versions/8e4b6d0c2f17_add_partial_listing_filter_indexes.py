@@ -0,0 +1,46 @@
+"""add partial indexes for the listing filters
+
+Revision ID: 8e4b6d0c2f17
+Revises: 3c1f2a9d7b41
+Create Date: 2026-10-18 10:03:27.540912
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4b6d0c2f17'
+down_revision = '3c1f2a9d7b41'
+branch_labels = None
+depends_on = None
+
+ACTIVE = sa.text('is_deleted = false')
+
+
+def upgrade():
+    # The listing endpoint never returns soft-deleted rows, so the partial
+    # index replaces the full (created_at, id) one
+    op.drop_index('ix_livestock_created_at_id', table_name='livestock')
+    op.create_index('ix_livestock_active_created_at_id', 'livestock',
+                    ['created_at', 'id'], postgresql_where=ACTIVE)
+    op.create_index('ix_livestock_active_species_created_at_id', 'livestock',
+                    ['livestock', 'created_at', 'id'], postgresql_where=ACTIVE)
+    op.create_index('ix_livestock_active_location_created_at_id', 'livestock',
+                    [sa.text('lower(location)'), 'created_at', 'id'], postgresql_where=ACTIVE)
+    op.create_index('ix_livestock_active_species_location_created_at_id', 'livestock',
+                    ['livestock', sa.text('lower(location)'), 'created_at', 'id'], postgresql_where=ACTIVE)
+    op.create_index('ix_livestock_active_species_price', 'livestock',
+                    ['livestock', 'breed'], postgresql_where=ACTIVE)
+    op.create_index('ix_livestock_active_price', 'livestock',
+                    ['breed'], postgresql_where=ACTIVE)
+
+
+def downgrade():
+    op.drop_index('ix_livestock_active_price', table_name='livestock')
+    op.drop_index('ix_livestock_active_species_price', table_name='livestock')
+    op.drop_index('ix_livestock_active_species_location_created_at_id', table_name='livestock')
+    op.drop_index('ix_livestock_active_location_created_at_id', table_name='livestock')
+    op.drop_index('ix_livestock_active_species_created_at_id', table_name='livestock')
+    op.drop_index('ix_livestock_active_created_at_id', table_name='livestock')
+    op.create_index('ix_livestock_created_at_id', 'livestock', ['created_at', 'id'])
@@ -0,0 +1,75 @@
+"""stamp livestock rows with the table version of their last write
+
+Revision ID: a4f7c2e91d38
+Revises: 7d1c4e8b2a69
+Create Date: 2026-10-21 14:27:05.613387
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4f7c2e91d38'
+down_revision = '7d1c4e8b2a69'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The statement trigger leaves the version it bumped to in a transaction-local
+    # setting, where the row trigger below picks it up
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger LANGUAGE plpgsql AS $$
+        DECLARE
+            bumped bigint;
+        BEGIN
+            UPDATE table_version SET version = version + 1, changed_at = clock_timestamp()
+            WHERE table_name = TG_TABLE_NAME
+            RETURNING version INTO bumped;
+            PERFORM set_config('table_version.' || TG_TABLE_NAME, bumped::text, true);
+            RETURN NULL;
+        END
+        $$
+    """)
+    op.execute("""
+        CREATE FUNCTION stamp_row_version() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            NEW.version := current_setting('table_version.' || TG_TABLE_NAME)::bigint;
+            RETURN NEW;
+        END
+        $$
+    """)
+
+    op.add_column('livestock', sa.Column('version', sa.BigInteger(), nullable=True))
+    # Existing rows in their old watermark order, all below the next bump
+    op.execute("""
+        UPDATE livestock SET version = ordered.n
+        FROM (SELECT id, row_number() OVER (ORDER BY updated_at, id) AS n FROM livestock) AS ordered
+        WHERE livestock.id = ordered.id
+    """)
+    op.execute("""
+        UPDATE table_version
+        SET version = greatest(version, (SELECT coalesce(max(version), 0) FROM livestock))
+        WHERE table_name = 'livestock'
+    """)
+    op.alter_column('livestock', 'version', nullable=False)
+    op.execute('CREATE TRIGGER stamp_row_version BEFORE INSERT OR UPDATE ON livestock '
+               'FOR EACH ROW EXECUTE FUNCTION stamp_row_version()')
+    op.create_index('ix_livestock_version_id', 'livestock', ['version', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_livestock_version_id', table_name='livestock')
+    op.execute('DROP TRIGGER stamp_row_version ON livestock')
+    op.drop_column('livestock', 'version')
+    op.execute('DROP FUNCTION stamp_row_version()')
+    op.execute("""
+        CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            UPDATE table_version SET version = version + 1, changed_at = clock_timestamp()
+            WHERE table_name = TG_TABLE_NAME;
+            RETURN NULL;
+        END
+        $$
+    """)
@@ -0,0 +1,33 @@
+"""add livestock_cluster rollup table for map clustering
+
+Revision ID: a91c7e2b4d58
+Revises: 5f0e9b3a7c26
+Create Date: 2026-10-18 15:07:33.281940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a91c7e2b4d58'
+down_revision = '5f0e9b3a7c26'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('livestock_cluster',
+    sa.Column('zoom', sa.SmallInteger(), nullable=False),
+    sa.Column('cell_x', sa.Integer(), nullable=False),
+    sa.Column('cell_y', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('lat_sum', sa.Float(), nullable=False),
+    sa.Column('lon_sum', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('zoom', 'cell_x', 'cell_y')
+    )
+    # Populate with `flask rebuild-clusters` after upgrading
+
+
+def downgrade():
+    op.drop_table('livestock_cluster')
@@ -0,0 +1,36 @@
+"""add generated search_vector column and GIN index to livestock
+
+Revision ID: b7d39e5a0c84
+Revises: 8e4b6d0c2f17
+Create Date: 2026-10-18 11:26:05.372014
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d39e5a0c84'
+down_revision = '8e4b6d0c2f17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('livestock', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(
+            "setweight(to_tsvector('english', coalesce(livestock, '')), 'A') || "
+            "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+            "setweight(to_tsvector('english', coalesce(location, '')), 'C')",
+            persisted=True
+        ), nullable=True))
+
+    op.create_index('ix_livestock_active_search_vector', 'livestock', ['search_vector'],
+                    postgresql_using='gin', postgresql_where=sa.text('is_deleted = false'))
+
+
+def downgrade():
+    op.drop_index('ix_livestock_active_search_vector', table_name='livestock')
+    with op.batch_alter_table('livestock', schema=None) as batch_op:
+        batch_op.drop_column('search_vector')
@@ -0,0 +1,40 @@
+"""add updated_at to farmer and broker, index updated_at for conditional GETs
+
+Revision ID: c4e7a1f09b35
+Revises: a91c7e2b4d58
+Create Date: 2026-10-18 16:22:48.730615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4e7a1f09b35'
+down_revision = 'a91c7e2b4d58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('farmer', 'broker'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False))
+            batch_op.create_index(batch_op.f(f'ix_{table}_updated_at'), ['updated_at'], unique=False)
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_user_updated_at'), ['updated_at'], unique=False)
+
+    op.create_index('ix_livestock_updated_at_id', 'livestock', ['updated_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_livestock_updated_at_id', table_name='livestock')
+
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_user_updated_at'))
+
+    for table in ('broker', 'farmer'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_index(batch_op.f(f'ix_{table}_updated_at'))
+            batch_op.drop_column('updated_at')
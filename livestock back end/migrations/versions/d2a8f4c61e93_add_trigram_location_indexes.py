@@ -0,0 +1,31 @@
+"""add pg_trgm indexes for fuzzy location search
+
+Revision ID: d2a8f4c61e93
+Revises: b7d39e5a0c84
+Create Date: 2026-10-18 12:41:52.906117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a8f4c61e93'
+down_revision = 'b7d39e5a0c84'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index('ix_farmer_farm_location_trgm', 'farmer', ['farm_location'],
+                    postgresql_using='gin', postgresql_ops={'farm_location': 'gin_trgm_ops'})
+    op.create_index('ix_livestock_active_location_trgm', 'livestock', ['location'],
+                    postgresql_using='gin', postgresql_ops={'location': 'gin_trgm_ops'},
+                    postgresql_where=sa.text('is_deleted = false'))
+
+
+def downgrade():
+    op.drop_index('ix_livestock_active_location_trgm', table_name='livestock')
+    op.drop_index('ix_farmer_farm_location_trgm', table_name='farmer')
+    # pg_trgm is left installed; other objects may depend on it
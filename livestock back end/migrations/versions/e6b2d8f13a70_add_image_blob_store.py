@@ -0,0 +1,41 @@
+"""add image_blob table and livestock.image_sha256 for the content-addressed image store
+
+Revision ID: e6b2d8f13a70
+Revises: c4e7a1f09b35
+Create Date: 2026-10-19 09:18:26.441073
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e6b2d8f13a70'
+down_revision = 'c4e7a1f09b35'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('image_blob',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('image_type', sa.String(length=10), nullable=False),
+    sa.Column('size', sa.BigInteger(), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    with op.batch_alter_table('livestock', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('image_sha256', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_livestock_image_sha256'), ['image_sha256'], unique=False)
+        batch_op.create_foreign_key('fk_livestock_image_sha256_image_blob', 'image_blob', ['image_sha256'], ['sha256'])
+
+
+def downgrade():
+    with op.batch_alter_table('livestock', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_livestock_image_sha256_image_blob', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_livestock_image_sha256'))
+        batch_op.drop_column('image_sha256')
+
+    op.drop_table('image_blob')
@@ -0,0 +1,26 @@
+"""add image_blob.variant_widths for responsive image variants
+
+Revision ID: f3a5c9e27d16
+Revises: e6b2d8f13a70
+Create Date: 2026-10-19 10:47:09.915382
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3a5c9e27d16'
+down_revision = 'e6b2d8f13a70'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('image_blob', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('variant_widths', sa.String(length=100), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('image_blob', schema=None) as batch_op:
+        batch_op.drop_column('variant_widths')
@@ -3,6 +3,11 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 import re
 from sqlalchemy.ext.hybrid import hybrid_property
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from utils.geo import encode_geohash
+
+# Encodings rendered for every uploaded image (see utils.thumbnails)
+IMAGE_VARIANT_FORMATS = ('webp', 'jpeg')
 
 class User(db.Model):
     __tablename__ = 'user'
@@ -17,7 +22,7 @@ class User(db.Model):
     is_deleted = db.Column(db.Boolean, default=False, nullable=False)
     deleted_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
-    updated_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now(), onupdate=db.func.now())
+    updated_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now(), onupdate=db.func.now(), index=True)
 
     farmer = db.relationship("Farmer", back_populates="user", uselist=False, 
                            cascade="all, delete-orphan")
@@ -95,10 +100,14 @@ class Farmer(db.Model):
     user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False, unique=True)
     farm_name = db.Column(db.String(250), nullable=False, index=True)
     farm_location = db.Column(db.String(250))
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    geohash = db.Column(db.String(12), nullable=True)
     is_active = db.Column(db.Boolean, default=True, nullable=False)
     is_deleted = db.Column(db.Boolean, default=False, nullable=False)
     deleted_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    updated_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now(), onupdate=db.func.now(), index=True)
  
     user = db.relationship("User", back_populates="farmer")
     livestock = db.relationship("livestock", back_populates="farmer", cascade="all, delete-orphan")
@@ -115,11 +124,19 @@ class Farmer(db.Model):
         self.deleted_at = None
         self.is_active = True
 
+    def set_coordinates(self, latitude, longitude):
+        """Set the farm position and its geohash"""
+        self.latitude = latitude
+        self.longitude = longitude
+        self.geohash = encode_geohash(latitude, longitude)
+
     def to_dict(self):
         return {
             'id': self.id,
             'user_id': self.user_id,
             'farm_location': self.farm_location,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
             'is_active': self.is_active,
             'created_at': self.created_at
         }
@@ -138,6 +155,7 @@ class broker(db.Model):
     is_deleted = db.Column(db.Boolean, default=False, nullable=False)
     deleted_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    updated_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now(), onupdate=db.func.now(), index=True)
     
     user = db.relationship("User", back_populates="broker")
 
@@ -174,8 +192,12 @@ class livestock(db.Model):
     breed = db.Column(db.Float, nullable=False)
     phone = db.Column(db.String(10), nullable=False)
     image_url = db.Column(db.Text, nullable=False)
+    image_sha256 = db.Column(db.String(64), db.ForeignKey('image_blob.sha256'), nullable=True, index=True)
     description = db.Column(db.Text, nullable=False)
     location = db.Column(db.String(250), nullable=False)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
+    geohash = db.Column(db.String(12), nullable=True)
     farmer_id = db.Column(db.Integer, db.ForeignKey('farmer.id', ondelete='CASCADE'), nullable=True)
     
     is_active = db.Column(db.Boolean, default=True, nullable=False)
@@ -183,8 +205,22 @@ class livestock(db.Model):
     deleted_at = db.Column(db.DateTime, nullable=True)
     created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
     updated_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now(), onupdate=db.func.now())
+    # table_version of the statement that last wrote the row, set by a trigger;
+    # unlike updated_at it follows commit order, so it serves as the export watermark
+    version = db.Column(db.BigInteger, nullable=False,
+                        server_default=db.FetchedValue(), server_onupdate=db.FetchedValue())
+
+    # Maintained by Postgres; deferred so listing pages never fetch it
+    search_vector = db.deferred(db.Column(TSVECTOR, db.Computed(
+        "setweight(to_tsvector('english', coalesce(livestock, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(location, '')), 'C')",
+        persisted=True
+    )))
 
     farmer = db.relationship("Farmer", back_populates="livestock")
+    # Many-to-one, so joining it never multiplies rows or adds per-row queries
+    image = db.relationship("ImageBlob", lazy="joined")
 
     def soft_delete(self):
         """Soft delete the livestock"""
@@ -198,15 +234,88 @@ class livestock(db.Model):
         self.deleted_at = None
         self.is_active = True
 
-    def to_dict(self):
+    def set_coordinates(self, latitude, longitude):
+        """Set the listing position and its geohash"""
+        self.latitude = latitude
+        self.longitude = longitude
+        self.geohash = encode_geohash(latitude, longitude)
+
+    @classmethod
+    def filtered(cls, **filters):
+        """Query active listings matching the given filters"""
+        return cls.query.filter(*cls.filters(**filters))
+
+    @classmethod
+    def filters(cls, species=None, location=None, min_price=None, max_price=None, posted_after=None):
+        """Conditions selecting active listings that match the given filters (breed holds the price)"""
+        conditions = [cls.is_deleted == db.false()]
+        if species:
+            conditions.append(cls.livestock == species)
+        if location:
+            conditions.append(db.func.lower(cls.location) == location.lower())
+        if min_price is not None:
+            conditions.append(cls.breed >= min_price)
+        if max_price is not None:
+            conditions.append(cls.breed <= max_price)
+        if posted_after is not None:
+            conditions.append(cls.created_at >= posted_after)
+        return conditions
+
+    @classmethod
+    def search(cls, text):
+        """Query active listings matching a web-style search string, plus their rank"""
+        tsquery = db.func.websearch_to_tsquery('english', text)
+        # float4 -> float8 so the rank round-trips exactly through the cursor
+        rank = db.cast(db.func.ts_rank_cd(cls.search_vector, tsquery), db.Float)
+        query = cls.query.filter(cls.is_deleted == db.false(),
+                                 cls.search_vector.op('@@')(tsquery))
+        return query, rank
+
+    # Column behind each to_dict() key, for ?fields= sparse fieldsets
+    DICT_COLUMNS = {
+        'id': 'id', 'livestock': 'livestock', 'breed': 'breed', 'phone': 'phone',
+        'image_url': 'image_url', 'srcset': 'image_sha256', 'description': 'description',
+        'location': 'location', 'latitude': 'latitude', 'longitude': 'longitude',
+        'farmer_id': 'farmer_id', 'is_active': 'is_active', 'created_at': 'created_at',
+        'updated_at': 'updated_at'
+    }
+
+    @classmethod
+    def sparse_options(cls, fields):
+        """
+        Loader options fetching only the columns to_dict(fields) reads.
+
+        id and created_at are always loaded because page cursors are built
+        from them; the image join is skipped unless srcset is requested.
+        """
+        if fields is None:
+            return []
+        unknown = [name for name in fields if name not in cls.DICT_COLUMNS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        columns = {cls.DICT_COLUMNS[name] for name in fields} | {'id', 'created_at'}
+        options = [db.load_only(*(getattr(cls, column) for column in sorted(columns)))]
+        if 'srcset' not in fields:
+            options.append(db.lazyload(cls.image))
+        return options
+
+    def srcset(self):
+        return self.image.srcset() if self.image is not None else None
+
+    def to_dict(self, fields=None):
+        if fields is not None:
+            return {name: self.srcset() if name == 'srcset' else getattr(self, name) for name in fields}
         return {
             'id': self.id,
             'livestock': self.livestock,
             'breed': self.breed,
             'phone': self.phone,
             'image_url': self.image_url,
+            'srcset': self.srcset(),
             'description': self.description,
             'location': self.location,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
             'farmer_id': self.farmer_id,
             'is_active': self.is_active,
             'created_at': self.created_at,
@@ -214,4 +323,112 @@ class livestock(db.Model):
         }
 
     def __repr__(self):
-        return f"<livestock id={self.id}, livestock={self.livestock}, farmer_id={self.farmer_id}>"
\ No newline at end of file
+        return f"<livestock id={self.id}, livestock={self.livestock}, farmer_id={self.farmer_id}>"
+
+class ImageBlob(db.Model):
+    __tablename__ = 'image_blob'
+
+    # Content address of an uploaded image; one row per distinct file
+    sha256 = db.Column(db.String(64), primary_key=True)
+    image_type = db.Column(db.String(10), nullable=False)
+    size = db.Column(db.BigInteger, nullable=False)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    # Comma-separated widths of the rendered variants; NULL until rendered
+    variant_widths = db.Column(db.String(100), nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now())
+    updated_at = db.Column(db.DateTime, nullable=False, server_default=db.func.now(), onupdate=db.func.now())
+
+    def srcset(self):
+        """srcset strings per variant format, or None before variants exist"""
+        if not self.variant_widths:
+            return None
+        widths = [int(w) for w in self.variant_widths.split(',')]
+        return {
+            fmt: ', '.join(f"/images/{self.sha256}_{w}.{fmt} {w}w" for w in widths)
+            for fmt in IMAGE_VARIANT_FORMATS
+        }
+
+    def __repr__(self):
+        return f"<ImageBlob sha256={self.sha256}, refs={self.ref_count}>"
+
+class LivestockCluster(db.Model):
+    __tablename__ = 'livestock_cluster'
+
+    # One row per (zoom, grid cell); maintained by utils.clusters
+    zoom = db.Column(db.SmallInteger, primary_key=True)
+    cell_x = db.Column(db.Integer, primary_key=True)
+    cell_y = db.Column(db.Integer, primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    lat_sum = db.Column(db.Float, nullable=False, default=0)
+    lon_sum = db.Column(db.Float, nullable=False, default=0)
+
+    def to_dict(self):
+        return {
+            'zoom': self.zoom,
+            'cell': [self.cell_x, self.cell_y],
+            'count': self.count,
+            'latitude': self.lat_sum / self.count,
+            'longitude': self.lon_sum / self.count
+        }
+
+    def __repr__(self):
+        return f"<LivestockCluster zoom={self.zoom}, cell=({self.cell_x}, {self.cell_y}), count={self.count}>"
+
+
+class TableVersion(db.Model):
+    __tablename__ = 'table_version'
+
+    # One row per tracked table. A statement trigger bumps the row inside every
+    # writing transaction, so the version moves forward in commit order
+    table_name = db.Column(db.String(63), primary_key=True)
+    version = db.Column(db.BigInteger, nullable=False, default=0)
+    changed_at = db.Column(db.DateTime(timezone=True), nullable=False, server_default=db.func.now())
+
+    def __repr__(self):
+        return f"<TableVersion {self.table_name}={self.version}>"
+
+# Partial indexes over active listings, one per supported filter combination
+# of livestock.filtered(). Each ends in (created_at, id) where it can so the
+# keyset page order is read straight off the index. The unfiltered one carries
+# breed (the price) as well, so a price range is checked in the index while
+# the page is walked in order instead of on every heap row.
+_active_listing = db.text('is_deleted = false')
+db.Index('ix_livestock_active_created_at_id_price',
+         livestock.created_at, livestock.id, livestock.breed,
+         postgresql_where=_active_listing)
+db.Index('ix_livestock_active_species_created_at_id',
+         livestock.livestock, livestock.created_at, livestock.id,
+         postgresql_where=_active_listing)
+db.Index('ix_livestock_active_location_created_at_id',
+         db.func.lower(livestock.location), livestock.created_at, livestock.id,
+         postgresql_where=_active_listing)
+db.Index('ix_livestock_active_species_location_created_at_id',
+         livestock.livestock, db.func.lower(livestock.location), livestock.created_at, livestock.id,
+         postgresql_where=_active_listing)
+db.Index('ix_livestock_active_species_price',
+         livestock.livestock, livestock.breed,
+         postgresql_where=_active_listing)
+db.Index('ix_livestock_active_search_vector',
+         livestock.search_vector,
+         postgresql_using='gin', postgresql_where=_active_listing)
+db.Index('ix_livestock_active_location_trgm',
+         livestock.location,
+         postgresql_using='gin', postgresql_ops={'location': 'gin_trgm_ops'},
+         postgresql_where=_active_listing)
+# Geohash prefix ranges stand in for a spatial index (no PostGIS needed)
+db.Index('ix_livestock_active_geohash',
+         livestock.geohash,
+         postgresql_ops={'geohash': 'varchar_pattern_ops'},
+         postgresql_where=db.text('is_deleted = false AND geohash IS NOT NULL'))
+
+# Trigram index for fuzzy farm location lookups (requires pg_trgm)
+db.Index('ix_farmer_farm_location_trgm',
+         Farmer.farm_location,
+         postgresql_using='gin', postgresql_ops={'farm_location': 'gin_trgm_ops'})
+db.Index('ix_farmer_geohash',
+         Farmer.geohash,
+         postgresql_ops={'geohash': 'varchar_pattern_ops'})
+
+# Serve the export's version watermark and its updated_at starting point
+db.Index('ix_livestock_version_id', livestock.version, livestock.id)
+db.Index('ix_livestock_updated_at_id', livestock.updated_at, livestock.id)
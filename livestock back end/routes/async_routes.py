@@ -0,0 +1,110 @@
+"""
+Coroutine versions of the read-heavy listing and directory views, served by asgi.py.
+
+Each runs in a Flask request context and builds its response from the same
+helpers as the view it stands in for, so the two answer byte for byte
+alike; only the queries go through async_db (asyncpg) instead of
+db.session. They read from the primary: replica routing is WSGI only.
+"""
+from functools import wraps
+
+from flask import jsonify, request
+from flask_jwt_extended import verify_jwt_in_request
+from config.config import async_db, cache, db
+from models.models import livestock, ImageBlob
+from routes.livestock_routes import parse_listing_filters
+from schemas.schemas import users_schema, farmers_schema, brokers_schema
+from utils.conditional import conditional_async
+from utils.eager import eager_options, schema_models
+from utils.fieldsets import parse_fields, sparse_schema
+from utils.pagination import get_limit, keyset_query, keyset_result
+from utils.serializers import compile_schema
+
+# Endpoint of the WSGI view -> coroutine serving it
+ASYNC_VIEWS = {}
+
+
+def serves(endpoint):
+    def decorator(view):
+        ASYNC_VIEWS[endpoint] = view
+        return view
+    return decorator
+
+
+def jwt_required_async(view):
+    """jwt_required() for coroutine views; failures are handled by the JWT error handlers"""
+    @wraps(view)
+    async def wrapper(*args, **kwargs):
+        verify_jwt_in_request()
+        return await view(*args, **kwargs)
+    return wrapper
+
+
+async def dump_all(schema):
+    """Every row of the schema's model, eager-loaded for and serialized by `schema`"""
+    query = db.select(schema.opts.model).options(*eager_options(schema))
+    rows = (await async_db.session.scalars(query)).all()
+    return compile_schema(schema)(rows)
+
+
+# Livestock routes
+@serves('livestock _bp.get_products')
+@conditional_async(livestock, ImageBlob)
+@cache.cached_async(tags=("livestock",))
+async def get_products():
+    try:
+        limit = get_limit(request.args)
+        fields = parse_fields(request.args)
+        query = (db.select(livestock)
+                 .filter(*livestock.filters(**parse_listing_filters(request.args)))
+                 .options(*livestock.sparse_options(fields)))
+        query = keyset_query(query, livestock.created_at, livestock.id,
+                             cursor=request.args.get("cursor"), limit=limit)
+        rows = (await async_db.session.scalars(query)).all()
+        items, next_cursor = keyset_result(rows, livestock.created_at, livestock.id, limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "items": [item.to_dict(fields) for item in items],
+        "next_cursor": next_cursor
+    })
+
+# Directory routes
+@serves('user_routes.get_users')
+@jwt_required_async
+@conditional_async(*schema_models(users_schema))
+async def get_users():
+    try:
+        schema = sparse_schema(users_schema, parse_fields(request.args))
+        return jsonify(await dump_all(schema)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@serves('farmer_routes.get_farmers')
+@jwt_required_async
+@conditional_async(*schema_models(farmers_schema))
+@cache.cached_async(tags=("farmers",))
+async def get_farmers():
+    try:
+        schema = sparse_schema(farmers_schema, parse_fields(request.args))
+        return jsonify(await dump_all(schema)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@serves('broker_routes.get_brokers')
+@jwt_required_async
+@conditional_async(*schema_models(brokers_schema))
+@cache.cached_async(tags=("brokers",))
+async def get_brokers():
+    try:
+        schema = sparse_schema(brokers_schema, parse_fields(request.args))
+        return jsonify(await dump_all(schema)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
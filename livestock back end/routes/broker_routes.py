@@ -1,19 +1,29 @@
 from flask import jsonify, request, Blueprint
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from config.config import create_app, db
+from config.config import create_app, db, cache, replicas
 from models.models import User,broker
 from schemas.schemas import (
     brokers_schema, brokers_schema
 )
+from utils.conditional import conditional
+from utils.eager import eager_options, schema_models
+from utils.fieldsets import parse_fields, sparse_schema
+from utils.serializers import compile_schema
 
 broker_routes = Blueprint('broker_routes', __name__)
+replicas.route_reads(broker_routes)
 # broker routes
 @broker_routes.route('/brokers', methods=['GET'])
 @jwt_required()
+@conditional(*schema_models(brokers_schema))
+@cache.cached(tags=("brokers",))
 def get_brokers():
     try:
-        brokers = broker.query.all()
-        return brokers_schema.jsonify(brokers), 200
+        schema = sparse_schema(brokers_schema, parse_fields(request.args))
+        brokers = broker.query.options(*eager_options(schema)).all()
+        return jsonify(compile_schema(schema)(brokers)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -48,6 +58,8 @@ def add_broker():
         new_broker = broker(user_id=user_id, company_name=company_name, address=address)
         db.session.add(new_broker)
         db.session.commit()
+        # Users embed their broker profile, and farmers embed their user
+        cache.invalidate("brokers", "users", "farmers")
 
         return brokers_schema.jsonify(new_broker), 201
     except Exception as e:
@@ -0,0 +1,46 @@
+from flask import jsonify, Blueprint
+from config.config import jwt
+
+errors = Blueprint('errors', __name__)
+# Error handlers
+@errors.app_errorhandler(404)
+def not_found_error(error):
+    return jsonify({"error": "Resource not found"}), 404
+
+@errors.app_errorhandler(400)
+def bad_request_error(error):
+    return jsonify({"error": "Bad request"}), 400
+
+@errors.app_errorhandler(500)
+def internal_error(error):
+    return jsonify({"error": "Internal server error"}), 500
+
+# JWT error handlers
+@errors.app_errorhandler(401)
+def unauthorized_error(error):
+    return jsonify({"error": "Unauthorized access"}), 401
+
+@errors.app_errorhandler(422)
+def unprocessable_entity_error(error):
+    return jsonify({"error": "Unprocessable entity"}), 422
+
+@jwt.expired_token_loader
+def expired_token_callback(jwt_header, jwt_payload):
+    return jsonify({
+        "error": "Token has expired",
+        "message": "Please log in again"
+    }), 401
+
+@jwt.invalid_token_loader
+def invalid_token_callback(error):
+    return jsonify({
+        "error": "Invalid token",
+        "message": "Please provide a valid token"
+    }), 401
+
+@jwt.unauthorized_loader
+def missing_token_callback(error):
+    return jsonify({
+        "error": "Authorization required",
+        "message": "Token is missing"
+    }), 401
@@ -1,19 +1,31 @@
 from flask import jsonify, request, Blueprint
 from flask_jwt_extended import jwt_required,get_jwt_identity
-from config.config import create_app,db
+from config.config import create_app,db,cache,replicas
 from models.models import User, Farmer
 from schemas.schemas import ( 
     farmer_schema, farmers_schema, 
 )
+from utils.conditional import conditional
+from utils.eager import eager_options, schema_models
+from utils.fieldsets import parse_fields, sparse_schema
+from utils.fuzzy import fuzzy_match
+from utils.pagination import get_limit
+from utils.serializers import compile_schema
 
 farmer_routes = Blueprint('farmer_routes', __name__)
+replicas.route_reads(farmer_routes)
 # Farmer routes
 @farmer_routes.route('/farmers', methods=['GET'])
 @jwt_required()
+@conditional(*schema_models(farmers_schema))
+@cache.cached(tags=("farmers",))
 def get_farmers():
     try:
-        farmers = Farmer.query.all()
-        return farmers_schema.jsonify(farmers), 200
+        schema = sparse_schema(farmers_schema, parse_fields(request.args))
+        farmers = Farmer.query.options(*eager_options(schema)).all()
+        return jsonify(compile_schema(schema)(farmers)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -49,6 +61,8 @@ def add_farmer():
         new_farmer = Farmer(user_id=user_id, farm_name=farm_name, farm_location=farm_location)
         db.session.add(new_farmer)
         db.session.commit()
+        # Users embed their farmer profile, and brokers embed their user
+        cache.invalidate("farmers", "users", "brokers")
 
         return farmer_schema.jsonify(new_farmer), 201
     except Exception as e:
@@ -59,7 +73,15 @@ def add_farmer():
 @jwt_required()
 def get_farmers_by_location(location):
     try:
-        farmers = Farmer.query.filter(Farmer.farm_location.ilike(f"%{location}%")).all()
-        return farmers_schema.jsonify(farmers), 200
+        limit = get_limit(request.args)
+        schema = sparse_schema(farmers_schema, parse_fields(request.args))
+        condition, score = fuzzy_match(Farmer.farm_location, location)
+        farmers = (Farmer.query.options(*eager_options(schema))
+                   .filter(condition)
+                   .order_by(score.desc(), Farmer.id)
+                   .limit(limit).all())
+        return jsonify(compile_schema(schema)(farmers)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
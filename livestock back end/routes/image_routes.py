@@ -0,0 +1,58 @@
+import os
+import re
+from flask import Blueprint, current_app, jsonify, request, send_file
+from utils.image_store import stored_path
+
+image_routes = Blueprint('image_routes', __name__)
+
+# Stored names are content addresses: <sha256>.<type> or <sha256>_<width>.<format>
+IMAGE_NAME = re.compile(r'^[0-9a-f]{64}(?:_[0-9]{1,5})?\.(png|jpeg|gif|webp)$')
+IMAGE_MIMETYPES = {'png': 'image/png', 'jpeg': 'image/jpeg', 'gif': 'image/gif', 'webp': 'image/webp'}
+
+# A name never points at different bytes, so clients may keep a copy for a year
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+
+def _offloaded(name, path, mimetype):
+    """
+    Empty response telling the front server to send the file itself.
+
+    nginx (X-Accel-Redirect) and Apache/lighttpd (X-Sendfile) then serve the
+    body with sendfile() and answer Range requests on their own.
+    """
+    response = current_app.response_class(mimetype=mimetype)
+    if current_app.config['IMAGE_SENDFILE'] == 'x-accel':
+        prefix = current_app.config['IMAGE_ACCEL_PREFIX'].rstrip('/')
+        response.headers['X-Accel-Redirect'] = f"{prefix}/{name[:2]}/{name[2:4]}/{name}"
+    else:
+        response.headers['X-Sendfile'] = os.path.abspath(path)
+    response.last_modified = os.stat(path).st_mtime
+    response.cache_control.public = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE
+    response.set_etag(name)
+    response = response.make_conditional(request)
+    if response.status_code == 304:
+        # Some front servers send the file regardless of a 304 status
+        response.headers.pop('X-Accel-Redirect', None)
+        response.headers.pop('X-Sendfile', None)
+    return response
+
+
+# Image routes
+@image_routes.route('/images/<name>', methods=['GET'])
+def get_image(name):
+    match = IMAGE_NAME.match(name)
+    path = stored_path(name) if match else None
+    if path is None or not os.path.isfile(path):
+        return jsonify({"error": "Image not found"}), 404
+
+    mimetype = IMAGE_MIMETYPES[match.group(1)]
+    if current_app.config['IMAGE_SENDFILE'] in ('x-accel', 'x-sendfile'):
+        response = _offloaded(name, path, mimetype)
+    else:
+        # Served through wsgi.file_wrapper, which gunicorn turns into
+        # sendfile() for full responses; werkzeug handles Range and 304s
+        response = send_file(path, mimetype=mimetype, etag=name, max_age=IMMUTABLE_MAX_AGE,
+                             conditional=True)
+    response.cache_control.immutable = True
+    return response
@@ -1,8 +1,14 @@
-from .user_routes import user_routes
-from .farmer_routes import farmer_routes
-from .broker_routes import broker_routes
-from config.config import create_app
+def register_blueprints(app):
+    """Import the route modules and register every blueprint on `app`"""
+    from routes.errors import errors
+    from routes.user_routes import user_routes
+    from routes.farmer_routes import farmer_routes
+    from routes.broker_routes import broker_routes
+    from routes.livestock_routes import livestock_bp
+    from routes.metrics_routes import metrics_routes
+    from routes.image_routes import image_routes
+    from routes.upload_routes import upload_routes
 
-app = create_app()
-
-__all__ = ["user_routes", "farmer_routes", "broker_routes"]
\ No newline at end of file
+    for blueprint in (errors, user_routes, farmer_routes, broker_routes, livestock_bp,
+                      metrics_routes, image_routes, upload_routes):
+        app.register_blueprint(blueprint)
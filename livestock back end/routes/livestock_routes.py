@@ -1,41 +1,409 @@
-from flask import Blueprint, request, jsonify
-from models.models import db, livestock  
+import csv
+import io
+from datetime import datetime
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from config.config import cache, replicas
+from models.models import db, livestock, Farmer, ImageBlob, LivestockCluster
+from utils.clusters import MAX_ZOOM, add_to_clusters, adjust_clusters, cell_range
+from utils.conditional import conditional
+from utils.export import csv_chunks, ndjson_chunks
+from utils.fieldsets import parse_fields
+from utils.fuzzy import fuzzy_match
+from utils.geo import bbox_around, distance_km, encode_geohash, parse_bbox, valid_coordinates, within_bbox
+from utils.image_store import save_listing_image
+from utils.ingest import bulk_insert_listings
+from utils.pagination import get_limit, keyset_page, ranked_page
 
 # Define the Blueprint
 livestock_bp = Blueprint("livestock _bp", __name__)
+replicas.route_reads(livestock_bp)
 
 
-@livestock_bp.route("/livestock ", methods=["GET"])
+def parse_listing_filters(args):
+    """Turn the listing query string into keyword arguments for livestock.filtered()"""
+    filters = {
+        "species": args.get("species"),
+        "location": args.get("location"),
+    }
+    for name in ("min_price", "max_price"):
+        value = args.get(name)
+        if value is not None:
+            try:
+                filters[name] = float(value)
+            except ValueError:
+                raise ValueError(f"{name} must be a number")
+    posted_after = args.get("posted_after")
+    if posted_after is not None:
+        try:
+            filters["posted_after"] = datetime.fromisoformat(posted_after)
+        except ValueError:
+            raise ValueError("posted_after must be an ISO 8601 date")
+    return filters
+
+
+@livestock_bp.route("/livestock", methods=["GET"])
+@conditional(livestock, ImageBlob)
+@cache.cached(tags=("livestock",))
 def get_products():
-    livestock  = livestock .query.all()
-    return jsonify([livestock .to_dict() for livestock  in livestock ])
+    try:
+        limit = get_limit(request.args)
+        fields = parse_fields(request.args)
+        query = (livestock.filtered(**parse_listing_filters(request.args))
+                 .options(*livestock.sparse_options(fields)))
+        items, next_cursor = keyset_page(
+            query, livestock.created_at, livestock.id,
+            cursor=request.args.get("cursor"), limit=limit
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "items": [item.to_dict(fields) for item in items],
+        "next_cursor": next_cursor
+    })
+
+@livestock_bp.route("/livestock/search", methods=["GET"])
+def search_products():
+    q = request.args.get("q", "").strip()
+    if not q:
+        return jsonify({"error": "q is required"}), 400
+
+    try:
+        limit = get_limit(request.args)
+        fields = parse_fields(request.args)
+        query, rank = livestock.search(q)
+        query = query.options(*livestock.sparse_options(fields))
+        rows, next_cursor = ranked_page(
+            query, rank, livestock.id,
+            cursor=request.args.get("cursor"), limit=limit
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "items": [dict(item.to_dict(fields), rank=item_rank) for item, item_rank in rows],
+        "next_cursor": next_cursor
+    })
+
+@livestock_bp.route("/livestock/location/<location>", methods=["GET"])
+def get_products_by_location(location):
+    try:
+        limit = get_limit(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    condition, score = fuzzy_match(livestock.location, location)
+    items = (livestock.query
+             .filter(livestock.is_deleted == db.false(), condition)
+             .order_by(score.desc(), livestock.id.desc())
+             .limit(limit).all())
+    return jsonify([item.to_dict() for item in items])
+
+@livestock_bp.route("/livestock/nearby", methods=["GET"])
+def get_products_nearby():
+    try:
+        latitude = float(request.args["lat"])
+        longitude = float(request.args["lon"])
+        radius_km = float(request.args.get("radius_km", 30))
+    except KeyError:
+        return jsonify({"error": "lat and lon are required"}), 400
+    except ValueError:
+        return jsonify({"error": "lat, lon and radius_km must be numbers"}), 400
+    if not valid_coordinates(latitude, longitude):
+        return jsonify({"error": "Invalid coordinates"}), 400
+    if not 0 < radius_km <= current_app.config['MAX_SEARCH_RADIUS_KM']:
+        return jsonify({"error": "radius_km is out of range"}), 400
+
+    try:
+        limit = get_limit(request.args)
+        fields = parse_fields(request.args)
+        distance = distance_km(livestock.latitude, livestock.longitude, latitude, longitude)
+        query = livestock.filtered(**parse_listing_filters(request.args)).filter(
+            within_bbox(livestock.latitude, livestock.longitude, livestock.geohash,
+                        *bbox_around(latitude, longitude, radius_km)),
+            distance <= radius_km
+        ).options(*livestock.sparse_options(fields))
+        rows, next_cursor = ranked_page(
+            query, distance, livestock.id,
+            cursor=request.args.get("cursor"), limit=limit, descending=False
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "items": [dict(item.to_dict(fields), distance_km=item_distance) for item, item_distance in rows],
+        "next_cursor": next_cursor
+    })
+
+@livestock_bp.route("/livestock/bbox", methods=["GET"])
+def get_products_in_bbox():
+    try:
+        min_lat, min_lon, max_lat, max_lon = parse_bbox(request.args.get("bbox"))
+        limit = get_limit(request.args)
+        fields = parse_fields(request.args)
+        # Sorted by distance from the centre of the box
+        distance = distance_km(livestock.latitude, livestock.longitude,
+                               (min_lat + max_lat) / 2, (min_lon + max_lon) / 2)
+        query = livestock.filtered(**parse_listing_filters(request.args)).filter(
+            within_bbox(livestock.latitude, livestock.longitude, livestock.geohash,
+                        min_lat, min_lon, max_lat, max_lon)
+        ).options(*livestock.sparse_options(fields))
+        rows, next_cursor = ranked_page(
+            query, distance, livestock.id,
+            cursor=request.args.get("cursor"), limit=limit, descending=False
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "items": [dict(item.to_dict(fields), distance_km=item_distance) for item, item_distance in rows],
+        "next_cursor": next_cursor
+    })
+
+@livestock_bp.route("/livestock/clusters", methods=["GET"])
+def get_product_clusters():
+    try:
+        min_lat, min_lon, max_lat, max_lon = parse_bbox(request.args.get("bbox"))
+        zoom = int(request.args["zoom"])
+    except KeyError:
+        return jsonify({"error": "zoom is required"}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if not 0 <= zoom <= MAX_ZOOM:
+        return jsonify({"error": f"zoom must be between 0 and {MAX_ZOOM}"}), 400
+
+    x0, y0, x1, y1 = cell_range(min_lat, min_lon, max_lat, max_lon, zoom)
+    if (x1 - x0 + 1) * (y1 - y0 + 1) > current_app.config['MAX_CLUSTER_CELLS']:
+        return jsonify({"error": "bbox is too large for this zoom"}), 400
+    clusters = LivestockCluster.query.filter(
+        LivestockCluster.zoom == zoom,
+        LivestockCluster.cell_x.between(x0, x1),
+        LivestockCluster.cell_y.between(y0, y1),
+        LivestockCluster.count > 0
+    ).all()
+    return jsonify([cluster.to_dict() for cluster in clusters])
+
+@livestock_bp.route("/livestock/export", methods=["GET"])
+@jwt_required()
+def export_products():
+    export_format = request.args.get("format", "ndjson")
+    if export_format not in ("ndjson", "csv"):
+        return jsonify({"error": "format must be ndjson or csv"}), 400
+
+    # Inclusive watermark: pass the version of the last row received. Versions
+    # are stamped in commit order, so a row written after this export read past
+    # its version gets a higher one; rows sharing the watermark's version may be
+    # sent twice, but none is skipped. An ISO 8601 since starts from an
+    # updated_at instead, which is only a starting point: updated_at is the
+    # writing transaction's start time, so a later pull by it can miss rows.
+    query = db.select(livestock).order_by(livestock.version, livestock.id)
+    since = request.args.get("since")
+    if since is not None:
+        try:
+            query = query.where(livestock.version >= int(since))
+        except ValueError:
+            try:
+                query = query.where(livestock.updated_at >= datetime.fromisoformat(since))
+            except ValueError:
+                return jsonify({"error": "since must be a version or an ISO 8601 timestamp"}), 400
+
+    def rows():
+        # yield_per streams through a server-side (named) cursor in batches,
+        # so memory use does not grow with the table
+        result = db.session.execute(
+            query.execution_options(yield_per=current_app.config['EXPORT_BATCH_SIZE'])
+        )
+        for item in result.scalars():
+            yield dict(item.to_dict(), is_deleted=item.is_deleted, version=item.version)
+
+    if export_format == "csv":
+        fieldnames = list(livestock().to_dict()) + ["is_deleted", "version"]
+        body, mimetype = csv_chunks(rows(), fieldnames), "text/csv"
+    else:
+        body, mimetype = ndjson_chunks(rows()), "application/x-ndjson"
 
-@livestock_bp.route("/livestock ", methods=["POST"])
+    response = Response(stream_with_context(body), mimetype=mimetype)
+    response.headers["Content-Disposition"] = f"attachment; filename=livestock.{export_format}"
+    return response
+
+def parse_listing(data):
+    """Validate one listing payload and return the column values for a new row"""
+    # Validate required fields (without livestock _id)
+    required_fields = ["livestock", "breed", "age", "image_url", "description", "location", "phone"]
+    if not isinstance(data, dict) or not all(field in data for field in required_fields):
+        raise ValueError("Missing required fields")
+
+    # Checked here so a bad value is reported against its row instead of
+    # failing the whole insert with a driver error
+    for field in ("livestock", "image_url", "description", "location"):
+        if not isinstance(data[field], str):
+            raise ValueError(f"{field} must be a string")
+        max_length = livestock.__table__.c[field].type.length
+        if max_length is not None and len(data[field]) > max_length:
+            raise ValueError(f"{field} must be at most {max_length} characters")
+
+    try:
+        breed = float(data["breed"])
+    except (TypeError, ValueError):
+        raise ValueError("breed must be a number")
+
+    # Same rule as livestockSchema.phone
+    phone = str(data["phone"])
+    if len(phone) != 10:
+        raise ValueError("Phone number must be 10 digits")
+
+    # Provide a default farmer_id or set to None 
+    farmer_id = data.get("farmer_id") or None  # CSV rows send "" when missing
+    if farmer_id is not None:
+        try:
+            farmer_id = int(farmer_id)
+        except (TypeError, ValueError):
+            raise ValueError("farmer_id must be an integer")
+
+    values = {
+        "livestock": data["livestock"],
+        "breed": breed,
+        "image_url": data["image_url"],
+        "description": data["description"],
+        "location": data["location"],
+        "phone": phone,
+        "farmer_id": farmer_id,
+        "latitude": None,
+        "longitude": None,
+        "geohash": None,
+    }
+
+    if data.get("latitude") not in (None, "") and data.get("longitude") not in (None, ""):
+        try:
+            latitude, longitude = float(data["latitude"]), float(data["longitude"])
+        except (TypeError, ValueError):
+            raise ValueError("Invalid coordinates")
+        if not valid_coordinates(latitude, longitude):
+            raise ValueError("Invalid coordinates")
+        values.update(latitude=latitude, longitude=longitude,
+                      geohash=encode_geohash(latitude, longitude))
+    return values
+
+
+def missing_farmers(farmer_ids):
+    """The ids in farmer_ids with no farmer row, found in one query"""
+    farmer_ids = {farmer_id for farmer_id in farmer_ids if farmer_id is not None}
+    if not farmer_ids:
+        return set()
+    found = db.session.execute(db.select(Farmer.id).where(Farmer.id.in_(farmer_ids))).scalars()
+    return farmer_ids - set(found)
+
+
+@livestock_bp.route("/livestock", methods=["POST"])
 def add_product():
     try:
         data = request.get_json()  # Ensure JSON is received
+        try:
+            values = parse_listing(data)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        if missing_farmers([values["farmer_id"]]):
+            return jsonify({"error": "Farmer not found"}), 400
 
-        # Validate required fields (without livestock _id)
-        required_fields = ["livestock", "breed", "age", "image_url", "description", "location", "phone"]
-        if not all(field in data for field in required_fields):
-            return jsonify({"error": "Missing required fields"}), 400
-
-        # Provide a default farmer_id or set to None 
-        farmer_id = data.get("farmer_id", None)  # Set None or default value if missing
-
-        new_livestock = livestock(
-            livestock=data["livestock"],
-            breed=float(data["breed"]),
-            image_url=data["image_url"],
-            description=data["description"],
-            location=data["location"],
-            phone=data["phone"],
-            farmer_id=farmer_id
-        )
+        new_livestock = livestock(**values)
+        if values["latitude"] is not None:
+            adjust_clusters(values["latitude"], values["longitude"], 1)
 
         db.session.add(new_livestock)
         db.session.commit()
+        # Farmers list their livestock ids, and users and brokers embed the farmer profile
+        cache.invalidate("livestock", "farmers", "users", "brokers")
         return jsonify(new_livestock.to_dict()), 201
 
     except Exception as e:
-        return jsonify({"error": str(e)}), 400  # Return error response
\ No newline at end of file
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400  # Return error response
+
+@livestock_bp.route("/livestock/bulk", methods=["POST"])
+@jwt_required()
+def add_products_bulk():
+    if request.mimetype == "text/csv":
+        records = list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+    else:
+        records = request.get_json(silent=True)
+        if not isinstance(records, list):
+            return jsonify({"error": "Expected a JSON array or text/csv body"}), 400
+
+    if not records:
+        return jsonify({"error": "No rows given"}), 400
+    max_rows = current_app.config['BULK_MAX_ROWS']
+    if len(records) > max_rows:
+        return jsonify({"error": f"At most {max_rows} rows per request"}), 413
+
+    # Validate everything first; nothing is written unless every row is valid
+    rows, indexes, errors = [], [], []
+    for index, record in enumerate(records):
+        try:
+            rows.append(parse_listing(record))
+            indexes.append(index)
+        except ValueError as e:
+            errors.append({"row": index, "error": str(e)})
+    missing = missing_farmers(row["farmer_id"] for row in rows)
+    if missing:
+        errors.extend({"row": index, "error": f"Farmer {row['farmer_id']} not found"}
+                      for index, row in zip(indexes, rows) if row["farmer_id"] in missing)
+        errors.sort(key=lambda error: error["row"])
+    if errors:
+        return jsonify({"error": "Invalid rows", "rows": errors}), 400
+
+    try:
+        ids = bulk_insert_listings(rows)
+        add_to_clusters([(row["latitude"], row["longitude"]) for row in rows
+                         if row["latitude"] is not None])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+
+    cache.invalidate("livestock", "farmers", "users", "brokers")
+    return jsonify({"inserted": len(ids), "ids": ids}), 201
+
+@livestock_bp.route("/livestock/<int:livestock_id>/image", methods=["POST"])
+@jwt_required()
+def upload_product_image(livestock_id):
+    item = livestock.query.get(livestock_id)
+    if item is None or item.is_deleted:
+        return jsonify({"error": "Livestock not found"}), 404
+    if item.farmer is not None and item.farmer.user_id != get_jwt_identity():
+        return jsonify({"error": "Unauthorized"}), 403
+
+    # Parsing request.files streams the body to disk through HashingFileStream
+    upload = request.files.get("image")
+    if upload is None:
+        return jsonify({"error": "Missing image file"}), 400
+    stream = upload.stream
+
+    try:
+        if not save_listing_image(item, stream):
+            return jsonify({"error": "File is not an allowed image type"}), 415
+        return jsonify(item.to_dict()), 200
+    except Exception as e:
+        stream.discard()
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+@livestock_bp.route("/livestock/<int:livestock_id>", methods=["DELETE"])
+@jwt_required()
+def delete_product(livestock_id):
+    try:
+        item = livestock.query.get(livestock_id)
+        if item is None or item.is_deleted:
+            return jsonify({"error": "Livestock not found"}), 404
+        if item.farmer is not None and item.farmer.user_id != get_jwt_identity():
+            return jsonify({"error": "Unauthorized"}), 403
+
+        item.soft_delete()
+        if item.latitude is not None and item.longitude is not None:
+            adjust_clusters(item.latitude, item.longitude, -1)
+        db.session.commit()
+        cache.invalidate("livestock")
+        return jsonify(item.to_dict()), 200
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
\ No newline at end of file
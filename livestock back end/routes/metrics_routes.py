@@ -0,0 +1,13 @@
+from flask import jsonify, Blueprint
+from config.config import db, replicas
+from utils.metrics import metrics
+from utils.pool import pool_status
+
+metrics_routes = Blueprint('metrics_routes', __name__)
+# Metrics routes
+@metrics_routes.route('/metrics', methods=['GET'])
+def get_metrics():
+    snapshot = metrics.snapshot()
+    snapshot['pools'] = {key or 'default': pool_status(engine) for key, engine in db.engines.items()}
+    snapshot['replicas'] = replicas.status()
+    return jsonify(snapshot), 200
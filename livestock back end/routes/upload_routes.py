@@ -0,0 +1,128 @@
+from flask import Blueprint, current_app, jsonify, request, url_for
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from werkzeug.exceptions import ClientDisconnected
+from werkzeug.http import http_date
+from models.models import db, livestock
+from utils.image_store import save_listing_image
+from utils.resumable import (UploadLocked, append_chunk, create_upload, finish_upload,
+                             load_upload, locked_partial, remove_upload)
+
+upload_routes = Blueprint('upload_routes', __name__)
+
+TUS_VERSION = '1.0.0'
+
+
+def _progress(response, upload, offset):
+    response.headers['Tus-Resumable'] = TUS_VERSION
+    response.headers['Upload-Offset'] = str(offset)
+    response.headers['Upload-Length'] = str(upload['length'])
+    response.headers['Upload-Expires'] = http_date(upload['expires'])
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+
+def _owned_upload(upload_id):
+    """The upload if it exists and belongs to the caller, else an error response"""
+    upload = load_upload(upload_id)
+    if upload is None:
+        return None, (jsonify({"error": "Upload not found"}), 404)
+    if upload['user_id'] != get_jwt_identity():
+        return None, (jsonify({"error": "Unauthorized"}), 403)
+    return upload, None
+
+
+# Resumable upload routes
+@upload_routes.route('/livestock/<int:livestock_id>/image/uploads', methods=['POST'])
+@jwt_required()
+def start_upload(livestock_id):
+    item = livestock.query.get(livestock_id)
+    if item is None or item.is_deleted:
+        return jsonify({"error": "Livestock not found"}), 404
+    if item.farmer is not None and item.farmer.user_id != get_jwt_identity():
+        return jsonify({"error": "Unauthorized"}), 403
+
+    try:
+        length = int(request.headers['Upload-Length'])
+    except (KeyError, ValueError):
+        return jsonify({"error": "Upload-Length header is required"}), 400
+    if length <= 0:
+        return jsonify({"error": "Upload-Length must be positive"}), 400
+    if length > current_app.config['MAX_CONTENT_LENGTH']:
+        return jsonify({"error": "Image is too large"}), 413
+
+    upload_id = create_upload(livestock_id, get_jwt_identity(), length)
+    response = current_app.response_class(status=201)
+    response.headers['Location'] = url_for('upload_routes.upload_progress', upload_id=upload_id)
+    return _progress(response, load_upload(upload_id), 0)
+
+
+@upload_routes.route('/uploads/<upload_id>', methods=['HEAD'])
+@jwt_required()
+def upload_progress(upload_id):
+    upload, error = _owned_upload(upload_id)
+    if error:
+        return error
+    return _progress(current_app.response_class(status=200), upload, upload['offset'])
+
+
+@upload_routes.route('/uploads/<upload_id>', methods=['PATCH'])
+@jwt_required()
+def append_upload(upload_id):
+    upload, error = _owned_upload(upload_id)
+    if error:
+        return error
+    if request.mimetype != 'application/offset+octet-stream':
+        return jsonify({"error": "Content-Type must be application/offset+octet-stream"}), 415
+    try:
+        offset = int(request.headers['Upload-Offset'])
+    except (KeyError, ValueError):
+        return jsonify({"error": "Upload-Offset header is required"}), 400
+
+    try:
+        with locked_partial(upload_id) as partial:
+            if offset != partial.tell():
+                response = jsonify({"error": "Upload-Offset does not match the upload"})
+                response.status_code = 409
+                return _progress(response, upload, partial.tell())
+            try:
+                offset = append_chunk(partial, request.stream, upload['length'])
+            except ClientDisconnected:
+                # What arrived is kept; the client resumes from HEAD
+                return jsonify({"error": "Upload interrupted"}), 400
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            if offset < upload['length']:
+                return _progress(current_app.response_class(status=204), upload, offset)
+            stream = finish_upload(upload_id)
+    except UploadLocked:
+        return jsonify({"error": "Upload is busy"}), 423
+
+    # Complete: hand the file to the normal image pipeline
+    try:
+        item = livestock.query.get(upload['livestock_id'])
+        if item is None or item.is_deleted:
+            stream.discard()
+            return jsonify({"error": "Livestock not found"}), 404
+        if not save_listing_image(item, stream):
+            return jsonify({"error": "File is not an allowed image type"}), 415
+        return _progress(jsonify(item.to_dict()), upload, offset)
+    except Exception as e:
+        stream.discard()
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 500
+
+
+@upload_routes.route('/uploads/<upload_id>', methods=['DELETE'])
+@jwt_required()
+def cancel_upload(upload_id):
+    upload, error = _owned_upload(upload_id)
+    if error:
+        return error
+    try:
+        with locked_partial(upload_id):
+            remove_upload(upload_id)
+    except UploadLocked:
+        return jsonify({"error": "Upload is busy"}), 423
+    response = current_app.response_class(status=204)
+    response.headers['Tus-Resumable'] = TUS_VERSION
+    return response
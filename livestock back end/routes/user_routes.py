@@ -4,14 +4,20 @@ from flask_jwt_extended import (
     create_access_token, create_refresh_token
 )
 from werkzeug.security import generate_password_hash, check_password_hash
-from config.config import create_app,db
+from config.config import create_app,db,cache,passwords,replicas
 from models.models import User, Farmer, broker
 from schemas.schemas import (
     user_schema, users_schema
 )
-import bcrypt
+from utils.conditional import conditional
+from utils.eager import eager_options, schema_models
+from utils.fieldsets import parse_fields, sparse_schema
+from utils.metrics import metrics
+from utils.passwords import HasherBusy
+from utils.serializers import compile_schema
 
 user_routes = Blueprint('user_routes', __name__)
+replicas.route_reads(user_routes)
 
 # User routes
 @user_routes.route('/register', methods=['POST'])
@@ -30,9 +36,8 @@ def register():
         if User.query.filter_by(email=email).first():
             return jsonify({"error": "Email already registered"}), 409
 
-        # Generate salt and hash password
-        salt = bcrypt.gensalt()
-        password_hash = bcrypt.hashpw(password.encode('utf-8'), salt)
+        # Hashed on the bcrypt pool
+        password_hash = passwords.hash(password)
 
         # Create new user
         new_user = User(
@@ -40,7 +45,7 @@ def register():
             email=email, 
             phone=phone, 
             role=role, 
-            password_hash=password_hash.decode('utf-8'),
+            password_hash=password_hash,
         )
         db.session.add(new_user)
         db.session.flush()  # This gets us the user.id before committing
@@ -75,8 +80,14 @@ def register():
             db.session.add(broker)
 
         db.session.commit()
+        cache.invalidate("users", "farmers", "brokers")
+        # Not signed in yet, so the after-write stickiness cannot key on the token
+        replicas.stick(new_user.id)
         return user_schema.jsonify(new_user), 201
-        
+
+    except HasherBusy:
+        db.session.rollback()
+        return jsonify({"error": "Too many requests, try again shortly"}), 503, {"Retry-After": "1"}
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 500
@@ -91,15 +102,21 @@ def login():
             return jsonify({"error": "Missing email or password"}), 400
 
         user = User.query.filter_by(email=email).first()
-
-        print(user)
-        print(user.password_hash)
-        
         if not user:
             return jsonify({"error": "User not found"}), 404
 
-        if not bcrypt.checkpw(password.encode('utf8'),user.password_hash.encode('utf8')):
-            return jsonify({"error": "Invalid password"})
+        if not passwords.check(password, user.password_hash):
+            return jsonify({"error": "Invalid password"}), 401
+
+        # Upgrade the hash while the plain password is at hand; under load
+        # it waits for a later login
+        if passwords.needs_rehash(user.password_hash):
+            try:
+                user.password_hash = passwords.hash(password)
+                db.session.commit()
+                metrics.incr('bcrypt.rehashed')
+            except HasherBusy:
+                pass
 
         # Create tokens
         access_token = create_access_token(identity=user.id)
@@ -111,15 +128,22 @@ def login():
             "refresh_token": refresh_token
         }), 200
 
+    except HasherBusy:
+        return jsonify({"error": "Too many requests, try again shortly"}), 503, {"Retry-After": "1"}
     except Exception as e:
+        db.session.rollback()
         return jsonify({"error": str(e)}), 500
 
 @user_routes.route('/users', methods=['GET'])
 @jwt_required()
+@conditional(*schema_models(users_schema))
 def get_users():
     try:
-        users = User.query.all()
-        return users_schema.jsonify(users), 200
+        schema = sparse_schema(users_schema, parse_fields(request.args))
+        users = User.query.options(*eager_options(schema)).all()
+        return jsonify(compile_schema(schema)(users)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -159,8 +183,11 @@ def add_user():
 @jwt_required()
 def get_users_by_role(role):
     try:
-        users = User.query.filter_by(role=role).all()
-        return users_schema.jsonify(users), 200
+        schema = sparse_schema(users_schema, parse_fields(request.args))
+        users = User.query.options(*eager_options(schema)).filter_by(role=role).all()
+        return jsonify(compile_schema(schema)(users)), 200
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
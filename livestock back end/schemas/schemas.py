@@ -67,6 +67,7 @@ class livestockSchema(ma.SQLAlchemyAutoSchema):
     class Meta:
         model = livestock
         load_instance = True
+        exclude = ('search_vector',)
 
     id = fields.Int(dump_only=True)
     product_name = fields.Str(required=True, validate=validate.Length(min=1, max=250))
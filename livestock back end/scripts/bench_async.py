@@ -0,0 +1,217 @@
+"""
+Compare the concurrent connections the WSGI and async serving modes sustain at a fixed p99.
+
+Starts gunicorn with gunicorn.conf.py twice, once with the default gthread
+workers serving wsgi.py and once with uvicorn workers serving asgi.py, both
+talking to Postgres through a local proxy that delays every reply from the
+server by --db-latency ms, as a database across the network would. Then
+for each --levels concurrency, that many keep-alive clients request GET
+/livestock and GET /users for --duration seconds. Prints throughput and
+latency per level, and for each mode the most clients it served with p99
+within --target-p99 ms. Listings and users are seeded first and removed at
+the end; run with CACHE_BACKEND=null to measure the database path rather
+than the response cache.
+
+Usage (from the "livestock back end" directory, against a scratch database):
+
+    CACHE_BACKEND=null python scripts/bench_async.py [--db-latency 50]
+        [--target-p99 1000] [--levels 8 16 32 48 64 128] [--duration 10] [--rows 100]
+
+Results on a 1-CPU container running the clients, the proxy and Postgres
+as well, with CACHE_BACKEND=null, DB_POOL_SIZE=30, DB_MAX_OVERFLOW=10 and
+the defaults above. gthread ran 2 workers x 4 threads and uvicorn ran 1
+worker:
+
+    mode   clients   req/s   p50 ms   p99 ms
+    wsgi         8      22      319      562
+    wsgi        16      31      543      761
+    wsgi        32      21     2116     2256
+    wsgi        64      34     1673     4018
+    asgi         8      22      371      426
+    asgi        16      42      376      529
+    asgi        32      82      382      552
+    asgi        48      93      483      811
+    asgi        64      98      670     1288
+
+    p99 <= 1000 ms: wsgi 16 clients, asgi 48 clients
+
+gthread keeps at most 8 requests waiting on Postgres, and everyone else
+queues behind them. The asyncio worker keeps as many waiting as its pool
+has connections, until the CPU runs out at about 100 req/s here. With the
+default pool (5 + 10 connections per worker) the asgi worker levels off
+at about 45 req/s, so raise DB_POOL_SIZE with the async mode if the
+database has connections to spare.
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from load_test import free_port, seed, unseed, wait_for  # noqa: E402
+
+MODES = (
+    ('wsgi', 'gthread'),
+    ('asgi', 'uvicorn.workers.UvicornWorker'),
+)
+ENDPOINTS = ('/livestock?limit=20', '/users?fields=id,name,role')
+
+
+class LatencyProxy:
+    """TCP proxy to Postgres that delivers each chunk from the server `latency` seconds late"""
+
+    def __init__(self, host, port, latency):
+        self.upstream = (host, port)
+        self.latency = latency
+        self.port = free_port()
+        self.loop = asyncio.new_event_loop()
+
+    def start(self):
+        ready = threading.Event()
+        threading.Thread(target=self._run, args=(ready,), daemon=True).start()
+        ready.wait()
+
+    def _run(self, ready):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_until_complete(asyncio.start_server(self._handle, '127.0.0.1', self.port))
+        ready.set()
+        self.loop.run_forever()
+
+    async def _handle(self, client_reader, client_writer):
+        try:
+            server_reader, server_writer = await asyncio.open_connection(*self.upstream)
+        except OSError:
+            client_writer.close()
+            return
+        await asyncio.gather(self._pipe(client_reader, server_writer, 0),
+                             self._pipe(server_reader, client_writer, self.latency))
+
+    async def _pipe(self, reader, writer, delay):
+        queue = asyncio.Queue()
+
+        async def deliver():
+            while True:
+                due, data = await queue.get()
+                if data is None:
+                    break
+                await asyncio.sleep(max(0, due - time.monotonic()))
+                writer.write(data)
+                await writer.drain()
+            writer.close()
+
+        delivery = asyncio.ensure_future(deliver())
+        try:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                queue.put_nowait((time.monotonic() + delay, data))
+        except OSError:
+            pass
+        queue.put_nowait((0, None))
+        try:
+            await delivery
+        except OSError:
+            pass
+
+
+async def client(port, headers, stop_at, latencies, errors):
+    """One keep-alive HTTP/1.1 client requesting ENDPOINTS in turn until stop_at"""
+    reader = writer = None
+    i = 0
+    while time.monotonic() < stop_at:
+        request = f"GET {ENDPOINTS[i % len(ENDPOINTS)]} HTTP/1.1\r\nHost: bench\r\n{headers}\r\n".encode()
+        i += 1
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(request)
+            head = await reader.readuntil(b'\r\n\r\n')
+            status = int(head.split(b' ', 2)[1])
+            length = 0
+            for line in head.split(b'\r\n')[1:]:
+                if line.lower().startswith(b'content-length:'):
+                    length = int(line.split(b':', 1)[1])
+            await reader.readexactly(length)
+        except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+            errors.append(type(e).__name__)
+            writer = None
+            continue
+        if status != 200:
+            errors.append(status)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+async def load(port, headers, concurrency, duration):
+    latencies, errors = [], []
+    stop_at = time.monotonic() + duration
+    await asyncio.gather(*(client(port, headers, stop_at, latencies, errors) for _ in range(concurrency)))
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000 if latencies else float('inf')  # noqa: E731
+    return len(latencies) / duration, pick(0.5), pick(0.99), len(errors)
+
+
+def run(mode, worker_class, args, proxy, headers):
+    port = free_port()
+    env = dict(os.environ, GUNICORN_WORKER_CLASS=worker_class, GUNICORN_BIND=f"127.0.0.1:{port}",
+               GUNICORN_ACCESSLOG='/dev/null', GUNICORN_LOGLEVEL='warning',
+               # A worker restarting mid-run would drop its clients' connections
+               GUNICORN_MAX_REQUESTS='0', DB_HOST='127.0.0.1', DB_PORT=str(proxy.port))
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'], cwd=ROOT, env=env)
+    best = 0
+    try:
+        wait_for(port)
+        # Warm up every worker's pool and compiled queries
+        asyncio.run(load(port, headers, 8, 2))
+        for concurrency in args.levels:
+            rate, p50, p99, errors = asyncio.run(load(port, headers, concurrency, args.duration))
+            print(f"{mode:<6}{concurrency:>8}{rate:>9.0f}{p50:>9.1f}{p99:>9.1f}{errors:>8}", flush=True)
+            if p99 <= args.target_p99 and not errors:
+                best = concurrency
+    finally:
+        server.terminate()
+        server.wait()
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--db-latency', type=float, default=50, help="ms added to every reply from Postgres")
+    parser.add_argument('--target-p99', type=float, default=1000, help="ms")
+    parser.add_argument('--levels', type=int, nargs='+', default=[8, 16, 32, 48, 64, 128])
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--rows', type=int, default=100)
+    args = parser.parse_args()
+
+    from flask_jwt_extended import create_access_token
+    from config.config import create_app
+
+    app = create_app()
+    tag = f"ba-{uuid.uuid4().hex[:8]}"
+    with app.app_context():
+        headers = f"Authorization: Bearer {create_access_token(identity='1')}\r\n"
+        seed(args.rows, tag)
+    proxy = LatencyProxy(os.getenv('DB_HOST', '127.0.0.1'), int(os.getenv('DB_PORT', 5432)), args.db_latency / 1000)
+    proxy.start()
+    try:
+        print(f"{'mode':<6}{'clients':>8}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        best = {mode: run(mode, worker_class, args, proxy, headers) for mode, worker_class in MODES}
+        print()
+        for mode, concurrency in best.items():
+            print(f"{mode}: {concurrency or 'no'} concurrent clients with p99 <= {args.target_p99:.0f} ms")
+    finally:
+        with app.app_context():
+            unseed(tag)
+
+
+if __name__ == '__main__':
+    main()
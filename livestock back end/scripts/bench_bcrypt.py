@@ -0,0 +1,103 @@
+"""
+Pick a BCRYPT_ROUNDS value and show what the bcrypt pool does to other requests.
+
+Part one times a single bcrypt hash at each cost factor and suggests the
+highest one under --target-ms. Part two simulates a login burst: --logins
+concurrent password checks run either inline (one per request thread, as
+before) or through utils.passwords.PasswordHasher, while a probe thread keeps
+doing a small piece of Python work standing in for an ordinary request. The
+probe's latency shows how much CPU the burst leaves for everything else.
+Needs bcrypt only; no database or app.
+
+Usage (from the "livestock back end" directory):
+
+    python scripts/bench_bcrypt.py [--target-ms 250] [--logins 32] [--rounds 12]
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bcrypt  # noqa: E402
+
+from utils.passwords import PasswordHasher  # noqa: E402
+
+PASSWORD = 'Market-day-2024'
+
+
+def time_rounds(target_ms):
+    print(f"{'rounds':>6}{'ms/hash':>10}")
+    suggested = None
+    for rounds in range(10, 15):
+        salt = bcrypt.gensalt(rounds=rounds)
+        start = time.perf_counter()
+        bcrypt.hashpw(PASSWORD.encode('utf-8'), salt)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{rounds:>6}{elapsed:>10.0f}")
+        if elapsed <= target_ms:
+            suggested = rounds
+    return suggested
+
+
+def probe(stop, latencies):
+    """Serialize a small listing page over and over, like a cheap GET"""
+    rows = [{'id': i, 'livestock': 'Goat', 'price': 1000 + i, 'location': 'Nakuru'} for i in range(200)]
+    while not stop.is_set():
+        start = time.perf_counter()
+        json.dumps(rows)
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.005)
+
+
+def burst(check, logins):
+    stop = threading.Event()
+    latencies = []
+    prober = threading.Thread(target=probe, args=(stop, latencies))
+    prober.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(logins) as requests:
+        results = list(requests.map(lambda _: check(), range(logins)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    prober.join()
+    assert all(results)
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95)] * 1000
+    return elapsed, p95
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--target-ms', type=float, default=250)
+    parser.add_argument('--logins', type=int, default=32)
+    parser.add_argument('--rounds', type=int, default=12)
+    args = parser.parse_args()
+
+    suggested = time_rounds(args.target_ms)
+    print(f"\nsuggested BCRYPT_ROUNDS for <= {args.target_ms:.0f} ms: {suggested}\n")
+
+    stored = bcrypt.hashpw(PASSWORD.encode('utf-8'), bcrypt.gensalt(rounds=args.rounds))
+    workers = max(1, (os.cpu_count() or 2) // 2)
+    hasher = PasswordHasher(SimpleNamespace(config={
+        'BCRYPT_ROUNDS': args.rounds, 'BCRYPT_WORKERS': workers, 'BCRYPT_MAX_QUEUE': args.logins
+    }))
+
+    print(f"{args.logins} concurrent logins at {args.rounds} rounds, {os.cpu_count()} CPUs\n")
+    print(f"{'mode':<22}{'burst s':>10}{'probe p95 ms':>14}")
+    modes = (
+        ('inline', lambda: bcrypt.checkpw(PASSWORD.encode('utf-8'), stored)),
+        (f'pool ({workers} workers)', lambda: hasher.check(PASSWORD, stored.decode('utf-8'))),
+    )
+    for label, check in modes:
+        elapsed, p95 = burst(check, args.logins)
+        print(f"{label:<22}{elapsed:>10.2f}{p95:>14.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+Compare listing insert throughput: one row per commit versus bulk execute_values.
+
+The single-row path does what POST /livestock does for each animal (build a
+livestock object, session.add, commit); the bulk path is what
+POST /livestock/bulk does (one execute_values INSERT, one commit). Both run the
+same parse_listing() validation. Inserted rows are tagged and deleted again at
+the end.
+
+Usage (from the "livestock back end" directory, against a scratch database):
+
+    python scripts/bench_bulk_insert.py [--rows 2000]
+"""
+import argparse
+import os
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import create_app, db  # noqa: E402
+from models.models import livestock  # noqa: E402
+from routes.livestock_routes import parse_listing  # noqa: E402
+from utils.ingest import bulk_insert_listings  # noqa: E402
+
+
+def payloads(count, tag):
+    for i in range(count):
+        yield {
+            "livestock": "Goat",
+            "breed": 8000 + i,
+            "age": 2,
+            "image_url": f"https://example.com/{i}.jpg",
+            "description": f"{tag} benchmark listing {i}",
+            "location": "Nakuru",
+            "phone": "0700000000",
+        }
+
+
+def single_row(count, tag):
+    start = time.perf_counter()
+    for payload in payloads(count, tag):
+        db.session.add(livestock(**parse_listing(payload)))
+        db.session.commit()
+    return time.perf_counter() - start
+
+
+def bulk(count, tag):
+    start = time.perf_counter()
+    bulk_insert_listings([parse_listing(payload) for payload in payloads(count, tag)])
+    db.session.commit()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    tag = f"bench-{uuid.uuid4().hex[:8]}"
+    app = create_app()
+    with app.app_context():
+        try:
+            for name, run in (("single-row", single_row), ("bulk", bulk)):
+                elapsed = run(args.rows, tag)
+                print(f"{name:<12}{args.rows:>8} rows {elapsed:>8.2f}s {args.rows / elapsed:>10.0f} rows/s")
+        finally:
+            livestock.query.filter(livestock.description.like(f"{tag} %")).delete(synchronize_session=False)
+            db.session.commit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Compare serving stored images through GET /images/<name> with a naive send_file.
+
+The naive route reads the whole file into memory and returns it with
+send_file(BytesIO), with no validators or ranges, the way a handler written
+without care would. The image route is routes.image_routes as deployed. Each
+scenario reports requests/s, MB/s and the CPU seconds the server spent.
+
+The server runs in a child process: gunicorn (which turns wsgi.file_wrapper
+into sendfile()) when it is installed, otherwise werkzeug's threaded server.
+Needs no database.
+
+Usage (from the "livestock back end" directory):
+
+    python scripts/bench_image_serving.py [--size-kb 512] [--requests 2000] [--concurrency 8]
+"""
+import argparse
+import hashlib
+import http.client
+import io
+import multiprocessing
+import os
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def make_app(folder=None):
+    from flask import Flask, send_file
+    from routes.image_routes import image_routes
+    from utils.image_store import stored_path
+
+    app = Flask(__name__)
+    app.config['UPLOAD_FOLDER'] = folder or os.environ['BENCH_UPLOAD_FOLDER']
+    app.config['IMAGE_SENDFILE'] = 'none'
+    app.config['IMAGE_ACCEL_PREFIX'] = '/protected-images/'
+    app.register_blueprint(image_routes)
+
+    @app.route('/naive/<name>')
+    def naive(name):
+        with open(stored_path(name), 'rb') as f:
+            data = f.read()
+        return send_file(io.BytesIO(data), mimetype='image/jpeg')
+
+    return app
+
+
+def _serve_werkzeug(folder, port):
+    import logging
+    from werkzeug.serving import make_server
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+    make_server('127.0.0.1', port, make_app(folder), threaded=True).serve_forever()
+
+
+def start_server(folder, port, concurrency):
+    try:
+        import gunicorn  # noqa: F401
+    except ImportError:
+        process = multiprocessing.get_context('spawn').Process(
+            target=_serve_werkzeug, args=(folder, port), daemon=True
+        )
+        process.start()
+        name, pid, stop = 'werkzeug', process.pid, process.terminate
+    else:
+        env = dict(os.environ, BENCH_UPLOAD_FOLDER=folder)
+        process = subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--bind', f'127.0.0.1:{port}', '--workers', '1',
+             '--threads', str(concurrency), '--chdir', ROOT, 'scripts.bench_image_serving:make_app()'],
+            env=env, stderr=subprocess.DEVNULL
+        )
+        name, pid, stop = 'gunicorn', process.pid, process.terminate
+
+    deadline = time.time() + 15
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return name, pid, stop
+        except OSError:
+            if time.time() > deadline:
+                stop()
+                raise RuntimeError("server did not start")
+            time.sleep(0.1)
+
+
+def cpu_seconds(pid):
+    """utime + stime of a process and its direct children, from /proc (Linux only)"""
+    tick = os.sysconf('SC_CLK_TCK')
+    total = 0
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+        except OSError:
+            continue
+        if int(entry) == pid or int(fields[1]) == pid:
+            total += int(fields[11]) + int(fields[12])
+    return total / tick
+
+
+def run(port, path, headers, requests, concurrency):
+    """Issue `requests` GETs over `concurrency` keep-alive connections; returns (seconds, bytes)"""
+    def worker(count):
+        connection = http.client.HTTPConnection('127.0.0.1', port)
+        received = 0
+        for _ in range(count):
+            connection.request('GET', path, headers=headers)
+            response = connection.getresponse()
+            received += len(response.read())
+            if response.status not in (200, 206, 304):
+                raise RuntimeError(f"{path} returned {response.status}")
+        connection.close()
+        return received
+
+    shares = [requests // concurrency] * concurrency
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        received = sum(executor.map(worker, shares))
+    return time.perf_counter() - start, received
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--size-kb', type=int, default=512)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix='bench-images-')
+    data = b'\xff\xd8\xff' + os.urandom(args.size_kb * 1024 - 3)
+    name = f"{hashlib.sha256(data).hexdigest()}.jpeg"
+    os.makedirs(os.path.join(folder, name[:2], name[2:4]))
+    with open(os.path.join(folder, name[:2], name[2:4], name), 'wb') as f:
+        f.write(data)
+
+    port = free_port()
+    server, pid, stop = start_server(folder, port, args.concurrency)
+    scenarios = (
+        ('naive send_file', f'/naive/{name}', {}),
+        ('image route', f'/images/{name}', {}),
+        ('image route, range 64KB', f'/images/{name}', {'Range': 'bytes=0-65535'}),
+        ('image route, revalidate', f'/images/{name}', {'If-None-Match': f'"{name}"'}),
+    )
+    try:
+        print(f"{server}, {args.size_kb} KB image, {args.requests} requests, concurrency {args.concurrency}\n")
+        print(f"{'scenario':<26}{'req/s':>10}{'MB/s':>10}{'cpu s':>8}")
+        for label, path, headers in scenarios:
+            run(port, path, headers, args.concurrency, args.concurrency)  # warm up
+            cpu = cpu_seconds(pid)
+            elapsed, received = run(port, path, headers, args.requests, args.concurrency)
+            cpu = cpu_seconds(pid) - cpu
+            print(f"{label:<26}{args.requests / elapsed:>10.0f}{received / elapsed / 2**20:>10.1f}{cpu:>8.2f}")
+    finally:
+        stop()
+        shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Measure connection pool checkout latency under concurrent load.
+
+Starts --threads threads that each run --queries short transactions
+(SELECT pg_sleep(--hold)) through the app's engine, using the pool settings
+from the environment (DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_PGBOUNCER, ...),
+then prints the db.pool.* metrics: checkout wait percentiles, connections
+opened and checkouts that timed out. Run it with more threads than
+DB_POOL_SIZE + DB_MAX_OVERFLOW to see queueing.
+
+Usage (from the "livestock back end" directory):
+
+    DB_POOL_SIZE=5 DB_MAX_OVERFLOW=0 python scripts/bench_pool.py [--threads 20] [--queries 50]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import exc, text  # noqa: E402
+
+from config.config import create_app, db  # noqa: E402
+from utils.metrics import metrics  # noqa: E402
+from utils.pool import pool_status  # noqa: E402
+
+
+def worker(engine, queries, hold):
+    for _ in range(queries):
+        try:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT pg_sleep(:hold)"), {"hold": hold})
+        except exc.TimeoutError:
+            pass  # counted as db.pool.timeouts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--threads', type=int, default=20)
+    parser.add_argument('--queries', type=int, default=50)
+    parser.add_argument('--hold', type=float, default=0.005, help="seconds each transaction holds its connection")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        engine = db.engine
+        threads = [threading.Thread(target=worker, args=(engine, args.queries, args.hold))
+                   for _ in range(args.threads)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        status = pool_status(engine)
+
+    snapshot = metrics.snapshot()
+    checkout = snapshot['timers']['db.pool.checkout']
+    total = args.threads * args.queries
+    print(f"pool size {app.config['DB_POOL_SIZE']} + overflow {app.config['DB_MAX_OVERFLOW']}, "
+          f"pgbouncer mode {'on' if app.config['DB_PGBOUNCER'] else 'off'}")
+    print(f"{total} transactions on {args.threads} threads in {elapsed:.2f}s ({total / elapsed:.0f}/s)")
+    print(f"checkout wait: avg {checkout['avg_ms']:.2f} ms, p50 {checkout['p50_ms']:.2f} ms, "
+          f"p95 {checkout['p95_ms']:.2f} ms, max {checkout['max_ms']:.2f} ms")
+    print(f"connections opened {snapshot['counters'].get('db.pool.connects', 0)}, "
+          f"timeouts {snapshot['counters'].get('db.pool.timeouts', 0)}, pool now {status}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Benchmark full-text listing search against the ILIKE scan it replaces.
+
+Copies the livestock table definition (generated search_vector column and
+indexes included) into a temporary table, fills it with synthetic rows using
+generate_series, then times the two query shapes for a handful of terms:
+
+    ilike     WHERE livestock ILIKE '%term%' OR description ILIKE ... OR location ILIKE ...
+    fts       WHERE search_vector @@ websearch_to_tsquery('english', term)
+              ORDER BY ts_rank_cd(...) DESC, id DESC
+
+Nothing is written to the real livestock table; the temp table disappears
+with the connection.
+
+Usage (from the "livestock back end" directory, against a migrated database):
+
+    python scripts/bench_search.py [--rows 1000000] [--repeat 20]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import create_app, db  # noqa: E402
+
+TERMS = ["dairy", "boer goat", "vaccinated heifer", "nakuru", "merino"]
+
+SEED_SQL = """
+INSERT INTO livestock_bench (id, livestock, breed, phone, image_url, description, location,
+                             is_active, is_deleted, created_at, updated_at)
+SELECT g,
+       (ARRAY['Goat', 'Cow', 'Sheep', 'Chicken', 'Pig', 'Camel'])[1 + g %% 6],
+       1000 + (g %% 500) * 100,
+       '0700000000',
+       'https://example.com/' || g || '.jpg',
+       (ARRAY['healthy', 'dairy', 'vaccinated', 'pregnant', 'young', 'boer', 'friesian',
+              'merino', 'heifer', 'layers'])[1 + g %% 10] || ' ' ||
+       (ARRAY['animal', 'stock', 'breed', 'heifer', 'ram', 'buck', 'kid', 'calf',
+              'hen', 'bull'])[1 + (g * 7) %% 10] ||
+       ' raised on pasture, dewormed and ready for sale. Contact for viewing.',
+       (ARRAY['Nakuru', 'Nairobi', 'Kiambu', 'Machakos', 'Kajiado', 'Narok', 'Meru',
+              'Kisumu'])[1 + (g * 3) %% 8],
+       true,
+       g %% 50 = 0,
+       now() - (g || ' minutes')::interval,
+       now()
+FROM generate_series(1, %(rows)s) AS g
+"""
+
+ILIKE_SQL = """
+SELECT id FROM livestock_bench
+WHERE is_deleted = false
+  AND (livestock ILIKE %(pattern)s OR description ILIKE %(pattern)s OR location ILIKE %(pattern)s)
+ORDER BY created_at DESC, id DESC
+LIMIT 50
+"""
+
+FTS_SQL = """
+SELECT id, ts_rank_cd(search_vector, websearch_to_tsquery('english', %(term)s)) AS rank
+FROM livestock_bench
+WHERE is_deleted = false
+  AND search_vector @@ websearch_to_tsquery('english', %(term)s)
+ORDER BY rank DESC, id DESC
+LIMIT 50
+"""
+
+
+def timed(connection, sql, params, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        connection.exec_driver_sql(sql, params).fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context(), db.engine.connect() as connection:
+        print(f"Seeding {args.rows} synthetic listings...")
+        start = time.perf_counter()
+        connection.exec_driver_sql(
+            "CREATE TEMP TABLE livestock_bench (LIKE livestock INCLUDING ALL EXCLUDING DEFAULTS)"
+        )
+        connection.exec_driver_sql(SEED_SQL, {"rows": args.rows})
+        connection.exec_driver_sql("ANALYZE livestock_bench")
+        connection.commit()
+        print(f"  done in {time.perf_counter() - start:.1f}s\n")
+
+        print(f"{'term':<20}{'ilike p50':>12}{'ilike p95':>12}{'fts p50':>12}{'fts p95':>12}")
+        for term in TERMS:
+            ilike = timed(connection, ILIKE_SQL, {"pattern": f"%{term}%"}, args.repeat)
+            fts = timed(connection, FTS_SQL, {"term": term}, args.repeat)
+            print(f"{term:<20}{ilike[0]:>10.1f}ms{ilike[1]:>10.1f}ms{fts[0]:>10.1f}ms{fts[1]:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Compare list serialization: marshmallow dump + json module versus compiled schemas + orjson.
+
+Builds users (alternately farmers with listings, and brokers) and listings
+in memory, then renders the GET /users, /farmers and /brokers payloads and a
+GET /livestock page both ways. Every pair of response bodies must be
+identical byte for byte or the script fails. Needs no database.
+
+Usage (from the "livestock back end" directory):
+
+    python scripts/bench_serializers.py [--rows 5000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from config.config import create_app  # noqa: E402
+from models.models import User, Farmer, broker, livestock, ImageBlob  # noqa: E402
+from schemas.schemas import users_schema, farmers_schema, brokers_schema  # noqa: E402
+from utils.serializers import compile_schema  # noqa: E402
+
+NAMES = ("Kiprop", "Wanjirū", "Achieng'", "Mwangi \"Jnr\"")
+
+
+def build(rows):
+    now = datetime(2024, 3, 1, 6, 30, 15, 123456)
+    users, listings = [], []
+    for i in range(rows):
+        created = now - timedelta(minutes=i)
+        user = User(id=i + 1, name=f"{NAMES[i % len(NAMES)]} {i}", email=f"user{i}@example.com",
+                    phone="0700000000", role="farmer" if i % 2 == 0 else "broker",
+                    password_hash="x", is_active=True, created_at=created, updated_at=created)
+        if i % 2 == 0:
+            user.farmer = Farmer(id=i + 1, user_id=user.id, farm_name=f"Farm {i}", farm_location="Nakuru",
+                                 latitude=-0.3031 + i * 1e-5, longitude=36.08, is_active=True,
+                                 created_at=created, updated_at=created)
+            for j in range(2):
+                item = livestock(id=i * 2 + j + 1, livestock="Goat", breed=4500.0 + j,
+                                 phone="0700000000", image_url="/images/x.jpeg",
+                                 description=f"Healthy goat {i}", location="Nakuru",
+                                 farmer_id=user.farmer.id, is_active=True,
+                                 created_at=created, updated_at=created)
+                item.image = ImageBlob(sha256="ab" * 32, image_type="jpeg", variant_widths="160,320")
+                user.farmer.livestock.append(item)
+                listings.append(item)
+        else:
+            user.broker = broker(id=i + 1, user_id=user.id, company_name=f"Co {i}", address="Eldoret",
+                                 is_active=True, created_at=created, updated_at=created)
+        users.append(user)
+    farmers = [u.farmer for u in users if u.farmer is not None]
+    brokers = [u.broker for u in users if u.broker is not None]
+    return users, farmers, brokers, listings
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, body
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    app = create_app()
+    default_json = DefaultJSONProvider(app)
+    users, farmers, brokers, listings = build(args.rows)
+    cases = (
+        ('/users', users_schema, users),
+        ('/farmers', farmers_schema, farmers),
+        ('/brokers', brokers_schema, brokers),
+    )
+
+    failures = 0
+    print(f"{'payload':<12}{'rows':>7}{'before ms':>12}{'after ms':>11}{'speedup':>9}")
+    with app.app_context():
+        runs = [
+            (name, len(objs),
+             lambda s=schema, o=objs: default_json.response(s.dump(o)).get_data(),
+             lambda s=schema, o=objs: app.json.response(compile_schema(s)(o)).get_data())
+            for name, schema, objs in cases
+        ]
+        runs.append((
+            '/livestock', len(listings),
+            lambda: default_json.response({"items": [item.to_dict() for item in listings],
+                                           "next_cursor": None}).get_data(),
+            lambda: app.json.response({"items": [item.to_dict() for item in listings],
+                                       "next_cursor": None}).get_data(),
+        ))
+        for name, count, before, after in runs:
+            before_time, before_body = timed(before, args.repeat)
+            after_time, after_body = timed(after, args.repeat)
+            same = before_body == after_body
+            failures += not same
+            print(f"{name:<12}{count:>7}{before_time * 1000:>12.1f}{after_time * 1000:>11.1f}"
+                  f"{before_time / after_time:>8.1f}x" + ("" if same else "  BODIES DIFFER"))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+"""
+Measure how many slow clients one gunicorn worker holds with the gthread and gevent worker classes.
+
+For each worker class, starts gunicorn with gunicorn.conf.py and a single
+worker (WEB_CONCURRENCY=1), talking to Postgres through the latency proxy
+of bench_async.py. Then for each --levels count, that many slow clients
+each send GET /livestock one header at a time over --send-seconds on a new
+connection, wait for the response and start again. Meanwhile --logins
+clients log in (bcrypt) in a loop and one probe client requests GET
+/livestock?limit=20 over keep-alive. Prints, per level, the slow requests
+completed and failed, logins per second and the probe's latency. A worker
+holds a level when no slow request fails and the probe's p99 stays within
+--target-p99 ms. Listings and a login user are seeded first and removed at
+the end; run with CACHE_BACKEND=null to measure the database path rather
+than the response cache.
+
+Usage (from the "livestock back end" directory, against a scratch database):
+
+    CACHE_BACKEND=null python scripts/bench_slow_clients.py [--classes gthread gevent]
+        [--levels 10 25 50 100 200 400] [--send-seconds 2] [--logins 2]
+        [--db-latency 20] [--target-p99 500] [--duration 10]
+
+Results on a 1-CPU container running the clients, the proxy and Postgres
+as well, with CACHE_BACKEND=null, BCRYPT_ROUNDS=12 and the defaults above:
+
+    class     slow   completed   failed   logins/s   p50 ms   p99 ms
+    gthread     10          50        0        1.0     2120     2765
+    gthread     50         237        0        0.8     2246     3762
+    gthread    400         672        0        0.2    13691    13691
+    gevent      10          50        0        2.4      121      386
+    gevent      25         125        0        2.6      116      313
+    gevent      50         250        0        2.4      117      548
+    gevent     100         496        0        2.1      116     1164
+    gevent     400        1086        0        1.2      121     2683
+
+A gthread worker spends one of its four threads on each slow client for
+as long as the client takes to send its request. With ten slow clients
+the probe waits seconds for a thread, and logins wait just as long. The
+gevent worker parks each slow client on its hub. It completes every slow
+request up to 100 clients (five per client in 10 s), and its probe p50
+stays flat. The p99 growth from 50 clients up is this one CPU also
+running the 400 clients. Logins go on at the speed of the bcrypt threads,
+which run off the hub. Without the psycopg2 wait callback, the gevent
+worker's probe p99 was 1.4 s at 10 slow clients and 5.7 s at 50.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_async import LatencyProxy  # noqa: E402
+from load_test import free_port, seed, unseed, wait_for  # noqa: E402
+
+PASSWORD = 'bench-password'
+# Seconds before a client gives up on a response
+CLIENT_TIMEOUT = 30
+
+
+async def read_response(reader):
+    """Read one HTTP/1.1 response with a Content-Length; returns its status"""
+    head = await reader.readuntil(b'\r\n\r\n')
+    length = 0
+    for line in head.split(b'\r\n')[1:]:
+        if line.lower().startswith(b'content-length:'):
+            length = int(line.split(b':', 1)[1])
+    await reader.readexactly(length)
+    return int(head.split(b' ', 2)[1])
+
+
+async def slow_client(port, send_seconds, stop_at, stats):
+    """Trickle each request's headers over send_seconds, as a client on a poor mobile link would"""
+    headers = [b'Host: bench', b'User-Agent: slow-client', b'Accept: application/json',
+               b'Accept-Language: en', b'Cache-Control: no-cache', b'Connection: close']
+    pause = send_seconds / (len(headers) + 1)
+    while time.monotonic() < stop_at:
+        writer = None
+        try:
+            reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(b'GET /livestock?limit=20 HTTP/1.1\r\n')
+            for header in headers:
+                await asyncio.sleep(pause)
+                writer.write(header + b'\r\n')
+                await writer.drain()
+            await asyncio.sleep(pause)
+            writer.write(b'\r\n')
+            status = await asyncio.wait_for(read_response(reader), CLIENT_TIMEOUT)
+            stats['completed' if status == 200 else 'failed'] += 1
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+            stats['failed'] += 1
+        finally:
+            if writer is not None:
+                writer.close()
+
+
+async def keepalive_client(port, request, stop_at, latencies, stats, key):
+    reader = writer = None
+    while time.monotonic() < stop_at:
+        start = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection('127.0.0.1', port)
+            writer.write(request)
+            status = await asyncio.wait_for(read_response(reader), CLIENT_TIMEOUT)
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ValueError):
+            stats['failed'] += 1
+            writer = None
+            continue
+        if status == 200:
+            stats[key] += 1
+            latencies.append(time.perf_counter() - start)
+        else:
+            stats['failed'] += 1
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, args, slow, email):
+    stats = {'completed': 0, 'failed': 0, 'logins': 0, 'probes': 0}
+    probe_latencies = []
+    body = json.dumps({'email': email, 'password': PASSWORD}).encode()
+    login = (b'POST /login HTTP/1.1\r\nHost: bench\r\nContent-Type: application/json\r\n'
+             b'Content-Length: %d\r\n\r\n' % len(body)) + body
+    probe = b'GET /livestock?limit=20 HTTP/1.1\r\nHost: bench\r\n\r\n'
+    stop_at = time.monotonic() + args.duration
+    await asyncio.gather(
+        *(slow_client(port, args.send_seconds, stop_at, stats) for _ in range(slow)),
+        *(keepalive_client(port, login, stop_at, [], stats, 'logins') for _ in range(args.logins)),
+        keepalive_client(port, probe, stop_at, probe_latencies, stats, 'probes'),
+    )
+    probe_latencies.sort()
+    pick = lambda q: (probe_latencies[min(len(probe_latencies) - 1, int(len(probe_latencies) * q))] * 1000  # noqa: E731
+                      if probe_latencies else float('inf'))
+    return stats, pick(0.5), pick(0.99)
+
+
+def run(worker_class, args, proxy, email):
+    port = free_port()
+    env = dict(os.environ, GUNICORN_WORKER_CLASS=worker_class, GUNICORN_BIND=f"127.0.0.1:{port}",
+               WEB_CONCURRENCY='1', GUNICORN_WORKER_CONNECTIONS=str(args.worker_connections),
+               GUNICORN_ACCESSLOG='/dev/null', GUNICORN_LOGLEVEL='warning',
+               # A worker restarting mid-run would drop its clients' connections
+               GUNICORN_MAX_REQUESTS='0', DB_HOST='127.0.0.1', DB_PORT=str(proxy.port))
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'], cwd=ROOT, env=env)
+    held = 0
+    try:
+        wait_for(port)
+        for slow in args.levels:
+            stats, p50, p99 = asyncio.run(load(port, args, slow, email))
+            print(f"{worker_class:<9}{slow:>6}{stats['completed']:>11}{stats['failed']:>8}"
+                  f"{stats['logins'] / args.duration:>10.1f}{p50:>10.1f}{p99:>10.1f}", flush=True)
+            if not stats['failed'] and p99 <= args.target_p99:
+                held = slow
+    finally:
+        server.terminate()
+        server.wait()
+    return held
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--classes', nargs='+', default=['gthread', 'gevent'])
+    parser.add_argument('--levels', type=int, nargs='+', default=[10, 25, 50, 100, 200, 400])
+    parser.add_argument('--send-seconds', type=float, default=2)
+    parser.add_argument('--logins', type=int, default=2)
+    parser.add_argument('--db-latency', type=float, default=20, help="ms added to every reply from Postgres")
+    parser.add_argument('--target-p99', type=float, default=500, help="ms")
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--worker-connections', type=int, default=1000)
+    parser.add_argument('--rows', type=int, default=100)
+    args = parser.parse_args()
+
+    from config.config import create_app, db, passwords
+    from models.models import User
+
+    app = create_app()
+    tag = f"sc-{uuid.uuid4().hex[:8]}"
+    email = f"{tag}-login@example.com"
+    with app.app_context():
+        seed(args.rows, tag)
+        db.session.add(User(name=f"{tag} login", email=email, phone="0700000000", role="buyer",
+                            password_hash=passwords.hash(PASSWORD)))
+        db.session.commit()
+    proxy = LatencyProxy(os.getenv('DB_HOST', '127.0.0.1'), int(os.getenv('DB_PORT', 5432)), args.db_latency / 1000)
+    proxy.start()
+    try:
+        print(f"{'class':<9}{'slow':>6}{'completed':>11}{'failed':>8}{'logins/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+        held = {worker_class: run(worker_class, args, proxy, email) for worker_class in args.classes}
+        print()
+        for worker_class, slow in held.items():
+            print(f"{worker_class}: held {slow or 'no'} slow clients with probe p99 <= {args.target_p99:.0f} ms")
+    finally:
+        with app.app_context():
+            unseed(tag)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Measure application startup: import time, app factory time and first-request latency.
+
+Every run starts a fresh interpreter that imports app.py (which builds the
+app once through create_app) and then sends GET requests through the test
+client: the first one to each endpoint pays for SQL compilation, mapper
+setup and opening a connection, the second shows the steady state.
+
+With --preload the app is built once and the requests are sent from a forked
+child, the way a gunicorn worker serves them with preload_app: imports and
+the factory are paid once in the master, and only first-request work is left
+to each worker. The app discards connections opened before the fork in
+the child itself (dispose_after_fork).
+
+Usage (from the "livestock back end" directory, against a scratch database):
+
+    python scripts/bench_startup.py [--runs 5] [--preload]
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ENDPOINTS = ('/metrics', '/livestock?limit=20', '/users', '/livestock/search?q=goat')
+
+CHILD = r"""
+import json, os, sys, time
+sys.path.insert(0, os.getcwd())
+result = {}
+start = time.perf_counter()
+import flask, flask_sqlalchemy, flask_jwt_extended  # noqa: E401
+result['framework_ms'] = (time.perf_counter() - start) * 1000
+start = time.perf_counter()
+from app import app
+result['app_ms'] = (time.perf_counter() - start) * 1000
+result['alembic_loaded'] = 'alembic' in sys.modules
+
+from flask_jwt_extended import create_access_token
+with app.app_context():
+    headers = {'Authorization': 'Bearer ' + create_access_token(identity='1')}
+
+
+def requests():
+    client = app.test_client()
+    timings = {}
+    for endpoint in ENDPOINTS:
+        times = []
+        for _ in range(2):
+            start = time.perf_counter()
+            status = client.get(endpoint, headers=headers).status_code
+            times.append((time.perf_counter() - start) * 1000)
+        timings[endpoint] = {'status': status, 'first_ms': times[0], 'second_ms': times[1]}
+    return timings
+
+
+if PRELOAD:
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read)
+        os.write(write, json.dumps(requests()).encode())
+        os._exit(0)
+    os.close(write)
+    with os.fdopen(read) as pipe:
+        result['requests'] = json.loads(pipe.read())
+    os.waitpid(pid, 0)
+else:
+    result['requests'] = requests()
+print(json.dumps(result))
+"""
+
+
+def run_once(preload):
+    code = f"ENDPOINTS = {ENDPOINTS!r}\nPRELOAD = {preload!r}\n" + CHILD
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True,
+                            capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--preload', action='store_true', help="send the requests from a forked child")
+    args = parser.parse_args()
+
+    results = [run_once(args.preload) for _ in range(args.runs)]
+    median = lambda values: statistics.median(values)  # noqa: E731
+
+    print(f"median of {args.runs} fresh processes{' (preload, requests after fork)' if args.preload else ''}")
+    print(f"import flask + extensions   {median([r['framework_ms'] for r in results]):8.1f} ms")
+    print(f"import app (create_app)     {median([r['app_ms'] for r in results]):8.1f} ms"
+          f"   alembic imported: {results[0]['alembic_loaded']}")
+    print(f"{'GET':<28}{'status':>7}{'first ms':>10}{'second ms':>11}")
+    for endpoint in ENDPOINTS:
+        rows = [r['requests'][endpoint] for r in results]
+        print(f"{endpoint:<28}{rows[0]['status']:>7}{median([r['first_ms'] for r in rows]):>10.1f}"
+              f"{median([r['second_ms'] for r in rows]):>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
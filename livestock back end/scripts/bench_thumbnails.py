@@ -0,0 +1,81 @@
+"""
+Measure responsive-variant throughput (images/sec, and per core).
+
+Renders a synthetic phone-sized JPEG into every configured width and format
+with utils.thumbnails.render_variants, through a spawn-context
+ProcessPoolExecutor like the upload path uses, at increasing worker counts.
+Needs Pillow only; no database or app.
+
+Usage (from the "livestock back end" directory):
+
+    python scripts/bench_thumbnails.py [--images 48] [--size 4000x3000]
+"""
+import argparse
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image, ImageFilter  # noqa: E402
+
+from utils.thumbnails import render_variants  # noqa: E402
+
+# Defaults of IMAGE_VARIANT_WIDTHS and IMAGE_VARIANT_FORMATS
+WIDTHS = (160, 320, 640, 1024)
+FORMATS = ('webp', 'jpeg')
+
+
+def make_source(directory, width, height):
+    """A noisy, blurred image compresses roughly like a real photo"""
+    image = Image.effect_noise((width, height), 64).convert('RGB')
+    image = image.filter(ImageFilter.GaussianBlur(2))
+    path = os.path.join(directory, 'source.jpeg')
+    image.save(path, quality=90)
+    return path
+
+
+def run(sources, workers):
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+        # Warm the pool so process start-up is not timed
+        list(executor.map(abs, range(workers)))
+        start = time.perf_counter()
+        list(executor.map(render_variants, sources, [WIDTHS] * len(sources), [FORMATS] * len(sources)))
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--images', type=int, default=48)
+    parser.add_argument('--size', default='4000x3000')
+    args = parser.parse_args()
+    width, height = (int(v) for v in args.size.split('x'))
+
+    directory = tempfile.mkdtemp(prefix='bench-thumbnails-')
+    try:
+        source = make_source(directory, width, height)
+        sources = []
+        for i in range(args.images):
+            copy = os.path.join(directory, f'{i:04d}.jpeg')
+            shutil.copyfile(source, copy)
+            sources.append(copy)
+
+        cpus = os.cpu_count() or 1
+        counts = sorted({1, 2, max(1, cpus // 2), cpus})
+        print(f"{args.images} images of {width}x{height}, widths {WIDTHS}, formats {FORMATS}\n")
+        print(f"{'workers':>8}{'seconds':>10}{'images/s':>10}{'per core':>10}")
+        for workers in counts:
+            elapsed = run(sources, workers)
+            rate = args.images / elapsed
+            print(f"{workers:>8}{elapsed:>10.2f}{rate:>10.2f}{rate / workers:>10.2f}")
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
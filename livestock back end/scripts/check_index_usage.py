@@ -0,0 +1,132 @@
+"""
+Check that every supported listing filter combination is served by its index.
+
+Seeds a realistic spread of listings inside a transaction, ANALYZEs the
+table, and runs EXPLAIN (FORMAT JSON) for the exact query GET /livestock
+issues, with the planner's default settings. Each combination must use its
+expected partial index, and every filtered column must appear in that
+index's Index Cond; a filter applied row by row after the scan does not
+count. The transaction is rolled back, so the seeded rows and statistics
+are discarded.
+
+Usage (from the "livestock back end" directory, against a migrated database):
+
+    python scripts/check_index_usage.py [--rows 50000]
+"""
+import argparse
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.config import create_app, db  # noqa: E402
+from models.models import livestock  # noqa: E402
+from utils.pagination import keyset_query  # noqa: E402
+
+WEEK_AGO = datetime.utcnow() - timedelta(days=7)
+
+# name -> (filters, expected index, columns that must be in its Index Cond)
+COMBINATIONS = {
+    "no filters": ({}, "ix_livestock_active_created_at_id_price", ()),
+    "species": ({"species": "Goat"}, "ix_livestock_active_species_created_at_id", ("livestock",)),
+    "location": ({"location": "Nakuru"}, "ix_livestock_active_location_created_at_id", ("location",)),
+    "species + location": ({"species": "Goat", "location": "Nakuru"},
+                           "ix_livestock_active_species_location_created_at_id", ("livestock", "location")),
+    "price range": ({"min_price": 5000, "max_price": 20000}, "ix_livestock_active_created_at_id_price", ("breed",)),
+    "species + price range": ({"species": "Goat", "min_price": 5000, "max_price": 20000},
+                              "ix_livestock_active_species_price", ("livestock", "breed")),
+    "posted after": ({"posted_after": WEEK_AGO}, "ix_livestock_active_created_at_id_price", ("created_at",)),
+    "species + posted after": ({"species": "Goat", "posted_after": WEEK_AGO},
+                               "ix_livestock_active_species_created_at_id", ("livestock", "created_at")),
+    "location + posted after": ({"location": "Nakuru", "posted_after": WEEK_AGO},
+                                "ix_livestock_active_location_created_at_id", ("location", "created_at")),
+}
+
+SPECIES = ("Goat", "Cow", "Sheep", "Chicken", "Pig", "Camel", "Donkey", "Rabbit", "Duck", "Turkey")
+LOCATIONS = ("Nakuru", "Nairobi", "Eldoret", "Kisumu", "Mombasa", "Nyeri", "Machakos", "Meru",
+             "Kericho", "Kitale", "Thika", "Embu", "Garissa", "Naivasha", "Narok", "Bomet",
+             "Kakamega", "Bungoma", "Malindi", "Lamu")
+
+# Prices spread over 0-1,000,000 and dates over the past year, so each
+# filter above keeps a small share of the rows, as it does in production
+SEED = f"""
+    INSERT INTO livestock (livestock, breed, phone, image_url, description, location,
+                           farmer_id, is_active, is_deleted, created_at, updated_at)
+    SELECT (ARRAY{list(SPECIES)!r})[1 + i %% {len(SPECIES)}],
+           (i * 7919) %% 1000000, '0700000000', '', 'seeded for check_index_usage',
+           (ARRAY{list(LOCATIONS)!r})[1 + (i / {len(SPECIES)}) %% {len(LOCATIONS)}],
+           %(farmer_id)s, true, i %% 20 = 0,
+           now() - (i %% 365) * interval '1 day' - (i %% 86400) * interval '1 second', now()
+    FROM generate_series(1, %(rows)s) AS i
+"""
+
+
+def plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def explain(connection, query):
+    compiled = query.statement.compile(dialect=connection.dialect)
+    result = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params)
+    return result.scalar()[0]["Plan"]
+
+
+def seed(connection, rows):
+    user_id = connection.exec_driver_sql(
+        'INSERT INTO "user" (name, email, phone, role, password_hash, is_active, is_deleted) '
+        "VALUES ('index check', 'index-check@example.com', '0700000000', 'farmer', 'x', true, false) "
+        "RETURNING id"
+    ).scalar()
+    farmer_id = connection.exec_driver_sql(
+        "INSERT INTO farmer (user_id, farm_name, is_active, is_deleted) "
+        "VALUES (%(user_id)s, 'index check', true, false) RETURNING id", {"user_id": user_id}
+    ).scalar()
+    connection.exec_driver_sql(SEED, {"farmer_id": farmer_id, "rows": rows})
+    connection.exec_driver_sql("ANALYZE livestock")
+
+
+def index_conds(nodes, index):
+    """Index Cond of every scan of `index` in the plan, e.g. ((livestock)::text = 'Goat'::text)"""
+    return [n.get("Index Cond", "") for n in nodes if n.get("Index Name") == index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=50000)
+    args = parser.parse_args()
+
+    app = create_app()
+    failures = 0
+    with app.app_context():
+        with db.engine.connect() as connection:
+            transaction = connection.begin()
+            try:
+                seed(connection, args.rows)
+                for name, (filters, expected, columns) in COMBINATIONS.items():
+                    query = keyset_query(livestock.filtered(**filters), livestock.created_at,
+                                         livestock.id, limit=app.config['PAGE_SIZE'])
+                    nodes = list(plan_nodes(explain(connection, query)))
+                    # Bitmap Index Scan nodes carry the index name but no relation name
+                    used = sorted({n["Index Name"] for n in nodes if "Index Name" in n})
+                    conds = index_conds(nodes, expected)
+                    missing = [c for c in columns
+                               if not any(re.search(rf"\b{c}\b", cond) for cond in conds)]
+                    if expected not in used:
+                        failures += 1
+                        print(f"FAIL  {name}: expected {expected}, plan uses {', '.join(used) or 'no index'}")
+                    elif missing:
+                        failures += 1
+                        print(f"FAIL  {name}: {', '.join(missing)} not in the Index Cond of {expected}")
+                    else:
+                        print(f"ok    {name}: {expected}" + (f" ({'; '.join(c for c in conds if c)})" if columns else ""))
+            finally:
+                transaction.rollback()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,116 @@
+"""
+Check that list endpoints issue a fixed number of SQL statements however many rows they return.
+
+Seeds users (alternately farmers with two listings each, and brokers) in
+growing batches, calls each endpoint through the test client after every
+batch, and counts the statements it sends. The check fails if any endpoint's
+count changes between batch sizes, which is what an N+1 lazy load looks like.
+Seeded rows are deleted again at the end. The response cache is disabled so
+every call reaches the database.
+
+Usage (from the "livestock back end" directory, against a scratch database):
+
+    python scripts/check_query_counts.py [--sizes 5 25 100]
+"""
+import argparse
+import os
+import sys
+import uuid
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ['CACHE_BACKEND'] = 'null'
+
+from flask_jwt_extended import create_access_token  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+from config.config import create_app, db  # noqa: E402
+from models.models import User, Farmer, broker, livestock  # noqa: E402
+
+ENDPOINTS = (
+    '/users',
+    '/users/role/farmer',
+    '/farmers',
+    '/farmers/location/Nakuru',
+    '/brokers',
+    '/users?fields=id,name,farmer.farm_name',
+    '/farmers?fields=id,farm_name,livestock',
+)
+
+
+def seed(count, tag, start):
+    for i in range(start, start + count):
+        is_farmer = i % 2 == 0
+        user = User(name=f"{tag} {i}", email=f"{tag}-{i}@example.com", phone="0700000000",
+                    role="farmer" if is_farmer else "broker", password_hash="x")
+        if is_farmer:
+            user.farmer = Farmer(farm_name=f"{tag} farm {i}", farm_location="Nakuru")
+            user.farmer.livestock = [
+                livestock(livestock="Goat", breed=i, phone="0700000000", image_url="",
+                          description=f"{tag} {i}", location="Nakuru")
+                for _ in range(2)
+            ]
+        else:
+            user.broker = broker(company_name=f"{tag} co {i}", address="Nakuru")
+        db.session.add(user)
+    db.session.commit()
+
+
+def register_blueprints(app):
+    from routes.user_routes import user_routes
+    from routes.farmer_routes import farmer_routes
+    from routes.broker_routes import broker_routes
+    for blueprint in (user_routes, farmer_routes, broker_routes):
+        if blueprint.name not in app.blueprints:
+            app.register_blueprint(blueprint)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5, 25, 100])
+    args = parser.parse_args()
+
+    app = create_app()
+    register_blueprints(app)
+    tag = f"qc-{uuid.uuid4().hex[:8]}"
+    statements = []
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute',
+                     lambda *a, **kw: statements.append(a[2]))
+        client = app.test_client()
+        seeded_user = User(name=tag, email=f"{tag}@example.com", phone="0700000000",
+                           role="admin", password_hash="x")
+        db.session.add(seeded_user)
+        db.session.commit()
+        headers = {'Authorization': f"Bearer {create_access_token(identity=str(seeded_user.id))}"}
+
+        counts = {endpoint: [] for endpoint in ENDPOINTS}
+        try:
+            seeded = 0
+            for size in args.sizes:
+                seed(size - seeded, tag, seeded)
+                seeded = size
+                for endpoint in ENDPOINTS:
+                    del statements[:]
+                    response = client.get(endpoint, headers=headers)
+                    if response.status_code != 200:
+                        raise SystemExit(f"{endpoint} returned {response.status_code}: {response.get_data(True)}")
+                    counts[endpoint].append(len(statements))
+        finally:
+            db.session.rollback()
+            users = User.query.filter(User.email.like(f"{tag}%")).all()
+            for user in users:
+                db.session.delete(user)
+            db.session.commit()
+
+    print(f"{'endpoint':<40}" + ''.join(f"{size:>8}" for size in args.sizes))
+    failures = 0
+    for endpoint, row in counts.items():
+        constant = len(set(row)) == 1
+        failures += not constant
+        print(f"{endpoint:<40}" + ''.join(f"{n:>8}" for n in row) + ("" if constant else "  GROWS"))
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
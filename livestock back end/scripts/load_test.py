@@ -0,0 +1,171 @@
+"""
+Load-test the API under gunicorn with the sync, gthread and gevent worker classes.
+
+For each worker class, starts gunicorn with gunicorn.conf.py (worker and
+thread counts as configured there for this machine), then --concurrency
+client threads with keep-alive connections request a mix of read endpoints
+for --duration seconds. Prints throughput, latency percentiles and errors
+per worker class. Listings and users are seeded first and removed at the
+end; run with CACHE_BACKEND=null to measure the database path rather than
+the response cache.
+
+Usage (from the "livestock back end" directory, against a scratch database):
+
+    CACHE_BACKEND=null python scripts/load_test.py [--classes sync gthread gevent]
+        [--concurrency 32] [--duration 15] [--rows 500]
+
+Results on a 1-CPU container running the clients and Postgres as well,
+CACHE_BACKEND=null, 32 clients for 15 s, 250 seeded farmers (two runs):
+
+    class     workers   req/s    p50 ms     p95 ms       p99 ms
+    sync      3         55       340        1470-1520    1720
+    gthread   2 x 4     54-64    265-300    2390-2590    3240-4620
+    gevent    1         69-89    205-305    1190-1400    1930-2390
+
+With one core, CPU is the limit for all three, and /farmers (every farmer
+with their listings) dominates the tail. The gevent row is with psycopg2
+waiting cooperatively (utils/green.py). Before that, its one worker ran
+requests strictly one after another, at 69-72 req/s with a 10 ms p50 and a
+2100-2340 ms p99. gthread stays the default in gunicorn.conf.py; gevent is
+for many slow clients (scripts/bench_slow_clients.py). Re-run on the
+production machine shape before changing it.
+"""
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ENDPOINTS = (
+    '/livestock?limit=20',
+    '/livestock/search?q=goat',
+    '/livestock/nearby?lat=-0.30&lon=36.08&radius_km=50',
+    '/users?fields=id,name,role',
+    '/farmers',
+)
+
+
+def seed(rows, tag):
+    from config.config import db
+    from models.models import User, Farmer, livestock
+    for i in range(rows // 2):
+        user = User(name=f"{tag} {i}", email=f"{tag}-{i}@example.com", phone="0700000000",
+                    role="farmer", password_hash="x")
+        user.farmer = Farmer(farm_name=f"{tag} farm {i}", farm_location="Nakuru")
+        user.farmer.livestock = [
+            livestock(livestock="Goat", breed=4000 + i, phone="0700000000", image_url="",
+                      description=f"Healthy goat {tag} {i}", location="Nakuru",
+                      latitude=-0.30 + i * 1e-4, longitude=36.08)
+            for _ in range(2)
+        ]
+        db.session.add(user)
+    db.session.commit()
+
+
+def unseed(tag):
+    from config.config import db
+    from models.models import User
+    for user in User.query.filter(User.email.like(f"{tag}%")).all():
+        db.session.delete(user)
+    db.session.commit()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            connection.request('GET', '/metrics')
+            connection.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f"gunicorn did not start on port {port}")
+
+
+def client(port, headers, stop_at, latencies, errors):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    i = 0
+    while time.time() < stop_at:
+        endpoint = ENDPOINTS[i % len(ENDPOINTS)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            connection.request('GET', endpoint, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(type(e).__name__)
+            connection.close()
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def run(worker_class, args, headers):
+    port = free_port()
+    env = dict(os.environ, GUNICORN_WORKER_CLASS=worker_class, GUNICORN_BIND=f"127.0.0.1:{port}",
+               GUNICORN_ACCESSLOG='/dev/null', GUNICORN_LOGLEVEL='warning')
+    server = subprocess.Popen([sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py'], cwd=ROOT, env=env)
+    try:
+        wait_for(port)
+        latencies, errors = [], []
+        stop_at = time.time() + args.duration
+        threads = [threading.Thread(target=client, args=(port, headers, stop_at, latencies, errors))
+                   for _ in range(args.concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    pick = lambda q: latencies[min(len(latencies) - 1, int(len(latencies) * q))] * 1000  # noqa: E731
+    return (len(latencies) / args.duration, pick(0.5), pick(0.95), pick(0.99), len(errors))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--classes', nargs='+', default=['sync', 'gthread', 'gevent'])
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=15)
+    parser.add_argument('--rows', type=int, default=500)
+    args = parser.parse_args()
+
+    from flask_jwt_extended import create_access_token
+    from config.config import create_app
+
+    app = create_app()
+    tag = f"lt-{uuid.uuid4().hex[:8]}"
+    with app.app_context():
+        headers = {'Authorization': f"Bearer {create_access_token(identity='1')}"}
+        seed(args.rows, tag)
+    try:
+        print(f"{'class':<10}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        for worker_class in args.classes:
+            rate, p50, p95, p99, errors = run(worker_class, args, headers)
+            print(f"{worker_class:<10}{rate:>8.0f}{p50:>9.1f}{p95:>9.1f}{p99:>9.1f}{errors:>8}")
+    finally:
+        with app.app_context():
+            unseed(tag)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+"""
+SQLAlchemy asyncio engine over asyncpg, for the views asgi.py serves natively.
+
+It connects to the same database as db with the pool settings of
+async_engine_options(). The engine is created on first use in each process
+(and event loop), since asyncpg connections belong to the loop that opened
+them and a preloaded gunicorn worker must not share the master's.
+"""
+import os
+
+from flask import g
+from sqlalchemy.engine import make_url
+
+from utils.pool import async_engine_options, instrument_engine
+
+
+class AsyncDatabase:
+    def __init__(self, app=None):
+        self._engine = None
+        self._engine_pid = None
+        self._sessionmaker = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.url = make_url(app.config['SQLALCHEMY_DATABASE_URI']).set(drivername='postgresql+asyncpg')
+        self.config = app.config
+        app.extensions['async_db'] = self
+
+    @property
+    def engine(self):
+        return self._process_engine()[0]
+
+    @property
+    def session(self):
+        """The AsyncSession of the current request, like db.session"""
+        if 'async_session' not in g:
+            g.async_session = self._process_engine()[1]()
+        return g.async_session
+
+    def _process_engine(self):
+        if self._engine is None or self._engine_pid != os.getpid():
+            # Imported here so the WSGI app never loads asyncpg
+            from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+            self._engine = create_async_engine(self.url, **async_engine_options(self.config))
+            instrument_engine(self._engine.sync_engine, self.config)
+            self._sessionmaker = async_sessionmaker(self._engine, expire_on_commit=False)
+            self._engine_pid = os.getpid()
+        return self._engine, self._sessionmaker
+
+    async def remove(self):
+        """Close the current request's session, returning its connection to the pool"""
+        session = g.pop('async_session', None)
+        if session is not None:
+            await session.close()
+
+    async def dispose(self):
+        if self._engine is not None and self._engine_pid == os.getpid():
+            await self._engine.dispose()
+        self._engine = None
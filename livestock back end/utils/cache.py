@@ -0,0 +1,282 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+
+from flask import current_app, g, request
+
+from utils.metrics import metrics
+from utils.replicas import use_primary
+
+
+class MemoryBackend:
+    """In-process LRU cache with per-entry TTL and tag-based invalidation"""
+
+    # Each worker process has its own
+    shared = False
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._tags = {}  # tag -> set of keys
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.time():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl, tags=()):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.time() + ttl, value, tuple(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                metrics.incr('cache.evictions')
+
+    def invalidate(self, *tags):
+        with self._lock:
+            for tag in tags:
+                for key in list(self._tags.get(tag, ())):
+                    self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tags.clear()
+
+    def _remove(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+
+class SQLiteBackend:
+    """
+    Cache shared by every worker on the host through one SQLite file.
+
+    Entries are evicted least recently used first once max_entries is exceeded.
+    Each thread keeps its own connection; WAL mode lets readers run alongside
+    the single writer. A hit records its access time only when the stored one
+    is over touch_interval seconds old, so hot keys are read without taking
+    the write lock on every request.
+    """
+
+    shared = True
+    touch_interval = 30
+
+    def __init__(self, path, max_entries=10000):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    expires_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS ix_entries_accessed_at ON entries (accessed_at);
+                CREATE TABLE IF NOT EXISTS tags (
+                    tag TEXT NOT NULL,
+                    key TEXT NOT NULL,
+                    PRIMARY KEY (tag, key)
+                );
+                CREATE INDEX IF NOT EXISTS ix_tags_key ON tags (key);
+            """)
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        # A connection opened before a fork (gunicorn preload) belongs to the parent
+        if conn is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key):
+        conn = self._connect()
+        now = time.time()
+        row = conn.execute('SELECT value, expires_at, accessed_at FROM entries WHERE key = ?',
+                           (key,)).fetchone()
+        if row is None:
+            return None
+        value, expires_at, accessed_at = row
+        if expires_at < now:
+            with conn:
+                self._delete_keys(conn, [key])
+            return None
+        if now - accessed_at > self.touch_interval:
+            conn.execute('UPDATE entries SET accessed_at = ? WHERE key = ?', (now, key))
+        return value
+
+    def set(self, key, value, ttl, tags=()):
+        conn = self._connect()
+        now = time.time()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            conn.execute('DELETE FROM tags WHERE key = ?', (key,))
+            conn.execute('INSERT OR REPLACE INTO entries (key, value, expires_at, accessed_at) '
+                         'VALUES (?, ?, ?, ?)', (key, value, now + ttl, now))
+            conn.executemany('INSERT OR IGNORE INTO tags (tag, key) VALUES (?, ?)',
+                             [(tag, key) for tag in tags])
+            excess = conn.execute('SELECT count(*) FROM entries').fetchone()[0] - self.max_entries
+            if excess > 0:
+                victims = [r[0] for r in conn.execute(
+                    'SELECT key FROM entries ORDER BY accessed_at LIMIT ?', (excess,))]
+                self._delete_keys(conn, victims)
+                metrics.incr('cache.evictions', len(victims))
+
+    def invalidate(self, *tags):
+        conn = self._connect()
+        with conn:
+            conn.execute('BEGIN IMMEDIATE')
+            for tag in tags:
+                keys = [r[0] for r in conn.execute('SELECT key FROM tags WHERE tag = ?', (tag,))]
+                self._delete_keys(conn, keys)
+
+    def clear(self):
+        conn = self._connect()
+        with conn:
+            conn.execute('DELETE FROM entries')
+            conn.execute('DELETE FROM tags')
+
+    @staticmethod
+    def _delete_keys(conn, keys):
+        for key in keys:
+            conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+            conn.execute('DELETE FROM tags WHERE key = ?', (key,))
+
+
+class ResponseCache:
+    """
+    Read-through cache for GET view responses.
+
+    Entries are stored under the request path and sorted query string, plus
+    the table-state ETag under @conditional, and labelled with tags; write
+    handlers call invalidate() with the tags whose responses they change,
+    e.g. adding a farmer invalidates "farmers" and "users" but leaves cached
+    listings alone.
+    """
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('CACHE_BACKEND', 'memory')
+        app.config.setdefault('CACHE_DEFAULT_TTL', 60)
+        app.config.setdefault('CACHE_MAX_ENTRIES', 1024)
+        app.config.setdefault('CACHE_SQLITE_PATH', os.path.join(app.instance_path, 'response_cache.sqlite3'))
+
+        backend = app.config['CACHE_BACKEND']
+        if backend == 'memory':
+            self.backend = MemoryBackend(app.config['CACHE_MAX_ENTRIES'])
+        elif backend == 'sqlite':
+            self.backend = SQLiteBackend(app.config['CACHE_SQLITE_PATH'], app.config['CACHE_MAX_ENTRIES'])
+        elif backend == 'null':
+            self.backend = None
+        else:
+            raise ValueError(f"Unknown CACHE_BACKEND {backend!r}")
+        app.extensions['response_cache'] = self
+
+    @staticmethod
+    def request_key():
+        # Encoded, so a value containing '&' or '=' cannot spell another request's key
+        query = urlencode(sorted(request.args.items(multi=True)))
+        key = f"{request.path}?{query}"
+        # Under @conditional, another worker may have cached this URL at an older
+        # table state; keying on the ETag keeps that body from going out under this one
+        etag = g.get('table_etag')
+        return f"{key}#{etag}" if etag else key
+
+    def lookup(self, key, tag):
+        """The cached body under `key` or None, counted as a hit or miss of `tag`"""
+        hit = self.backend.get(key)
+        outcome = 'hits' if hit is not None else 'misses'
+        metrics.incr(f'cache.{outcome}')
+        metrics.incr(f'cache.{outcome}.{tag}')
+        return hit
+
+    def cached(self, tags, ttl=None):
+        """
+        Cache successful responses of a GET view.
+
+        `tags` may contain format fields filled from the view arguments,
+        e.g. ("farmers", "farmer:{farmer_id}").
+        """
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if self.backend is None:
+                    return view(*args, **kwargs)
+
+                key = self.request_key()
+                entry_tags = [tag.format(**kwargs) for tag in tags]
+                hit = self.lookup(key, entry_tags[0])
+                if hit is not None:
+                    return self._hit_response(hit)
+
+                # What is stored here is served to everyone; never fill it from a lagging replica
+                use_primary()
+                response = current_app.make_response(view(*args, **kwargs))
+                return self._fill(key, response, entry_tags, ttl)
+            return wrapper
+        return decorator
+
+    def cached_async(self, tags, ttl=None):
+        """cached() for coroutine views"""
+        def decorator(view):
+            @wraps(view)
+            async def wrapper(*args, **kwargs):
+                if self.backend is None:
+                    return await view(*args, **kwargs)
+
+                key = self.request_key()
+                entry_tags = [tag.format(**kwargs) for tag in tags]
+                hit = self.lookup(key, entry_tags[0])
+                if hit is not None:
+                    return self._hit_response(hit)
+
+                response = current_app.make_response(await view(*args, **kwargs))
+                return self._fill(key, response, entry_tags, ttl)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def _hit_response(hit):
+        response = current_app.response_class(hit, mimetype='application/json')
+        response.headers['X-Cache'] = 'HIT'
+        return response
+
+    def _fill(self, key, response, tags, ttl):
+        if response.status_code == 200 and not response.is_streamed:
+            self.backend.set(key, response.get_data(), ttl or current_app.config['CACHE_DEFAULT_TTL'], tags)
+        response.headers['X-Cache'] = 'MISS'
+        return response
+
+    def invalidate(self, *tags):
+        if self.backend is not None:
+            self.backend.invalidate(*tags)
+            metrics.incr('cache.invalidations', len(tags))
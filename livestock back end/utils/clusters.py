@@ -0,0 +1,117 @@
+import math
+
+from config.config import db
+
+# Zoom levels with a maintained rollup; past this the map asks /livestock/bbox
+# for individual markers instead
+MAX_ZOOM = 16
+
+# Each web-mercator tile is split into 2**SUBDIVISION cells per side, so a
+# cluster covers roughly 64x64 pixels of a 256px tile
+SUBDIVISION = 2
+
+MAX_MERCATOR_LAT = 85.05112878
+
+
+def _clamp_cell_sql(cell):
+    # Longitude 180 and the southern Mercator limit land one past the last
+    # cell, so clamp as cell_range() does
+    return f"greatest(0, least(power(2, z + {SUBDIVISION})::integer - 1, {cell}))"
+
+
+def _cell_x_sql(lon):
+    return _clamp_cell_sql(f"floor(({lon} + 180.0) / 360.0 * power(2, z + {SUBDIVISION}))::integer")
+
+
+def _cell_y_sql(lat):
+    lat = f"radians(greatest(-{MAX_MERCATOR_LAT}, least({MAX_MERCATOR_LAT}, {lat})))"
+    return _clamp_cell_sql(f"floor((1.0 - ln(tan({lat}) + 1.0 / cos({lat})) / pi()) / 2.0 "
+                           f"* power(2, z + {SUBDIVISION}))::integer")
+
+
+# Cells are always computed by Postgres, for both the incremental upsert and
+# the rebuild, so a listing is added to and removed from exactly the same cell
+_UPSERT_SQL = f"""
+INSERT INTO livestock_cluster (zoom, cell_x, cell_y, count, lat_sum, lon_sum)
+SELECT z,
+       {_cell_x_sql('CAST(:longitude AS double precision)')},
+       {_cell_y_sql('CAST(:latitude AS double precision)')},
+       :delta,
+       :delta * CAST(:latitude AS double precision),
+       :delta * CAST(:longitude AS double precision)
+FROM generate_series(0, {MAX_ZOOM}) AS z
+ON CONFLICT (zoom, cell_x, cell_y) DO UPDATE SET
+    count = livestock_cluster.count + EXCLUDED.count,
+    lat_sum = livestock_cluster.lat_sum + EXCLUDED.lat_sum,
+    lon_sum = livestock_cluster.lon_sum + EXCLUDED.lon_sum
+"""
+
+_REBUILD_SQL = f"""
+INSERT INTO livestock_cluster (zoom, cell_x, cell_y, count, lat_sum, lon_sum)
+SELECT z,
+       {_cell_x_sql('l.longitude')},
+       {_cell_y_sql('l.latitude')},
+       count(*),
+       sum(l.latitude),
+       sum(l.longitude)
+FROM livestock AS l
+CROSS JOIN generate_series(0, {MAX_ZOOM}) AS z
+WHERE l.is_deleted = false AND l.latitude IS NOT NULL AND l.longitude IS NOT NULL
+GROUP BY 1, 2, 3
+"""
+
+
+_BULK_ADD_SQL = f"""
+INSERT INTO livestock_cluster (zoom, cell_x, cell_y, count, lat_sum, lon_sum)
+SELECT z,
+       {_cell_x_sql('p.longitude')},
+       {_cell_y_sql('p.latitude')},
+       count(*),
+       sum(p.latitude),
+       sum(p.longitude)
+FROM unnest(CAST(:latitudes AS double precision[]), CAST(:longitudes AS double precision[]))
+     AS p(latitude, longitude)
+CROSS JOIN generate_series(0, {MAX_ZOOM}) AS z
+GROUP BY 1, 2, 3
+ON CONFLICT (zoom, cell_x, cell_y) DO UPDATE SET
+    count = livestock_cluster.count + EXCLUDED.count,
+    lat_sum = livestock_cluster.lat_sum + EXCLUDED.lat_sum,
+    lon_sum = livestock_cluster.lon_sum + EXCLUDED.lon_sum
+"""
+
+
+def adjust_clusters(latitude, longitude, delta):
+    """Add (delta=1) or remove (delta=-1) one listing from every zoom level's rollup"""
+    db.session.execute(db.text(_UPSERT_SQL),
+                       {'latitude': latitude, 'longitude': longitude, 'delta': delta})
+
+
+def add_to_clusters(points):
+    """Add many (latitude, longitude) listings to the rollups in one statement"""
+    if not points:
+        return
+    latitudes, longitudes = zip(*points)
+    db.session.execute(db.text(_BULK_ADD_SQL),
+                       {'latitudes': list(latitudes), 'longitudes': list(longitudes)})
+
+
+def rebuild_clusters():
+    """Recompute every rollup from the listings table"""
+    db.session.execute(db.text('DELETE FROM livestock_cluster'))
+    db.session.execute(db.text(_REBUILD_SQL))
+
+
+def cell_range(min_lat, min_lon, max_lat, max_lon, zoom):
+    """Return (x0, y0, x1, y1), the inclusive cell index range covering a bbox"""
+    cells = 2 ** (zoom + SUBDIVISION)
+
+    def cell_x(lon):
+        return min(cells - 1, max(0, math.floor((lon + 180.0) / 360.0 * cells)))
+
+    def cell_y(lat):
+        lat = math.radians(max(-MAX_MERCATOR_LAT, min(MAX_MERCATOR_LAT, lat)))
+        y = (1.0 - math.log(math.tan(lat) + 1.0 / math.cos(lat)) / math.pi) / 2.0
+        return min(cells - 1, max(0, math.floor(y * cells)))
+
+    # Mercator y grows southwards
+    return cell_x(min_lon), cell_y(max_lat), cell_x(max_lon), cell_y(min_lat)
@@ -0,0 +1,106 @@
+import hashlib
+from datetime import timezone
+from functools import wraps
+
+from flask import current_app, g, request
+
+from config.config import async_db, db
+from models.models import TableVersion
+
+
+def table_state_query(*models):
+    """SELECT of (table_name, version, changed_at) from table_version for each model"""
+    names = [model.__tablename__ for model in models]
+    return db.select(TableVersion.table_name, TableVersion.version, TableVersion.changed_at).where(
+        TableVersion.table_name.in_(names)
+    )
+
+
+def table_state(*models):
+    """
+    Return [(version, changed_at), ...] for each model in one round trip.
+
+    A statement trigger bumps a table's version inside every transaction that
+    inserts, updates, deletes or truncates its rows, holding the counter row
+    until commit, so the versions move forward in commit order and stand in
+    for the content of the tables without loading any rows.
+    """
+    return _ordered(db.session.execute(table_state_query(*models)).all(), models)
+
+
+def _ordered(rows, models):
+    state = {name: (version, changed_at) for name, version, changed_at in rows}
+    missing = [model.__tablename__ for model in models if model.__tablename__ not in state]
+    if missing:
+        # An untracked table would never change the ETag
+        raise LookupError(f"No table_version row for {', '.join(missing)}; add its trigger in a migration")
+    return [state[model.__tablename__] for model in models]
+
+
+def _validators(state):
+    """(etag, last_modified, not_modified) for the current request and table state"""
+    fingerprint = f"{request.full_path}|" + "|".join(
+        f"{version}:{changed_at.isoformat()}" for version, changed_at in state
+    )
+    etag = hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()
+    last_modified = max(changed_at for _, changed_at in state).astimezone(timezone.utc).replace(microsecond=0)
+
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
+    else:
+        since = request.if_modified_since
+        not_modified = bool(since and last_modified <= since)
+    return etag, last_modified, not_modified
+
+
+def _set_validators(response, etag, last_modified):
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    return response
+
+
+def conditional(*models):
+    """
+    Answer conditional GETs for a view whose output depends only on `models`.
+
+    Computes a strong ETag and Last-Modified from table_state() plus the request
+    URL, and returns 304 Not Modified for a matching If-None-Match (or, when that
+    header is absent, a satisfied If-Modified-Since) before the view runs.
+    Otherwise the ETag is left in g.table_etag, where ResponseCache adds it to
+    the cache key, so a cached body is only ever sent under the ETag of the
+    table state it was cached at.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            etag, last_modified, not_modified = _validators(table_state(*models))
+            if not_modified:
+                response = current_app.response_class(status=304)
+            else:
+                g.table_etag = etag
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            return _set_validators(response, etag, last_modified)
+        return wrapper
+    return decorator
+
+
+def conditional_async(*models):
+    """conditional() for coroutine views, reading the table state through async_db"""
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(*args, **kwargs):
+            rows = (await async_db.session.execute(table_state_query(*models))).all()
+            etag, last_modified, not_modified = _validators(_ordered(rows, models))
+            if not_modified:
+                response = current_app.response_class(status=304)
+            else:
+                g.table_etag = etag
+                response = current_app.make_response(await view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            return _set_validators(response, etag, last_modified)
+        return wrapper
+    return decorator
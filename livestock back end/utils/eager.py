@@ -0,0 +1,89 @@
+from functools import lru_cache
+
+from marshmallow import fields
+from marshmallow_sqlalchemy.fields import Related, RelatedList
+from sqlalchemy import inspect
+from sqlalchemy.orm import joinedload, load_only, selectinload
+
+# Schemas seen by the option caches; sparse fieldsets add one per distinct ?fields=
+CACHE_SIZE = 1024
+
+
+def eager_options(schema):
+    """
+    Loader options that fetch everything `schema` will serialize up front, and nothing else.
+
+    Walks the schema's dump fields (after only/exclude) and eager-loads the
+    matching relationships: joinedload for a single object, selectinload for
+    a collection, recursing into nested schemas. A list endpoint then issues
+    a fixed number of queries however many rows it returns, instead of one
+    lazy load per row and relationship. Each entity's SELECT is narrowed with
+    load_only to the columns its schema dumps, so a schema built with
+    only=(...) never fetches the columns it leaves out.
+    """
+    model = schema.opts.model
+    columns, loaders = _plan(schema, model)
+    return ((load_only(*columns),) if columns else ()) + loaders
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _plan(schema, model):
+    """(columns to load or None for all, relationship loaders) for one schema level"""
+    mapper = inspect(model)
+    columns = []
+    narrow = True
+    loaders = []
+    for name, field in schema.dump_fields.items():
+        attribute = field.attribute or name
+        if attribute in mapper.column_attrs:
+            columns.append(getattr(model, attribute))
+            continue
+        relationship = mapper.relationships.get(attribute)
+        if relationship is None:
+            # A field that is neither may read any column
+            narrow = False
+            continue
+        related = getattr(model, relationship.key)
+        loader = selectinload(related) if relationship.uselist else joinedload(related)
+
+        if isinstance(field, fields.Nested):
+            child_columns, children = _plan(field.schema, relationship.mapper.class_)
+            if child_columns:
+                loader = loader.load_only(*child_columns)
+            loaders.append(loader.options(*children) if children else loader)
+        elif isinstance(field, (Related, RelatedList)):
+            # Only the related keys are dumped; skip their own eager joins
+            related_mapper = relationship.mapper
+            keys = [getattr(related_mapper.class_, related_mapper.get_property_by_column(column).key)
+                    for column in related_mapper.primary_key]
+            loaders.append(loader.load_only(*keys).lazyload('*'))
+        else:
+            narrow = False
+    return (tuple(columns) if narrow else None), tuple(loaders)
+
+
+def schema_models(schema):
+    """
+    Every model whose rows `schema` dumps, ordered by table name.
+
+    Follows the same dump fields as eager_options(): a nested schema adds its
+    model and everything it dumps, and a related-keys field adds the related
+    model, whose rows come and go with the key list. A conditional GET built
+    from this list covers at least everything in the body.
+    """
+    return tuple(sorted(_models(schema, schema.opts.model), key=lambda model: model.__tablename__))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _models(schema, model):
+    mapper = inspect(model)
+    models = {model}
+    for name, field in schema.dump_fields.items():
+        relationship = mapper.relationships.get(field.attribute or name)
+        if relationship is None:
+            continue
+        if isinstance(field, fields.Nested):
+            models |= _models(field.schema, relationship.mapper.class_)
+        else:
+            models.add(relationship.mapper.class_)
+    return frozenset(models)
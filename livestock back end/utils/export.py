@@ -0,0 +1,41 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+# Rows serialized per chunk handed to the WSGI server
+EXPORT_CHUNK_ROWS = 500
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def ndjson_chunks(rows):
+    """Yield newline-delimited JSON, one object per row dict"""
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, default=_default, separators=(',', ':')))
+        if len(lines) >= EXPORT_CHUNK_ROWS:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def csv_chunks(rows, fieldnames):
+    """Yield CSV text with a header row, flushing every EXPORT_CHUNK_ROWS rows"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fieldnames, extrasaction='ignore')
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow({k: v.isoformat() if isinstance(v, datetime) else v for k, v in row.items()})
+        count += 1
+        if count % EXPORT_CHUNK_ROWS == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,49 @@
+from functools import lru_cache
+
+from marshmallow import fields
+
+from utils.eager import CACHE_SIZE
+
+
+def parse_fields(args):
+    """Field names requested with ?fields=a,b,c, in order without repeats, or None for all"""
+    raw = args.get('fields')
+    if raw is None:
+        return None
+    names = tuple(dict.fromkeys(name.strip() for name in raw.split(',') if name.strip()))
+    if not names:
+        raise ValueError('fields must name at least one field')
+    return names
+
+
+def sparse_schema(schema, names):
+    """
+    `schema` itself, or a copy limited to `names` when a fieldset was requested.
+
+    Copies are cached per distinct fieldset so their eager-load options and
+    compiled serializers are built once. Dotted names reach into nested
+    schemas (farmer.farm_name). Names the schema does not dump, including
+    ones excluded by Meta or marked load_only (password_hash, password),
+    raise ValueError.
+    """
+    if names is None:
+        return schema
+    return _sparse_schema(type(schema), schema.many, tuple(sorted(names)))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _sparse_schema(schema_class, many, names):
+    # only= accepts excluded and load-only names and then dumps nothing for them
+    full = schema_class(many=many)
+    unknown = [name for name in names if not _dumped(full, name)]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return schema_class(many=many, only=names)
+
+
+def _dumped(schema, name):
+    head, _, rest = name.partition('.')
+    field = schema.dump_fields.get(head)
+    if field is None:
+        return False
+    return not rest or (isinstance(field, fields.Nested) and _dumped(field.schema, rest))
@@ -0,0 +1,22 @@
+from config.config import db
+
+
+def escape_like(term):
+    """Escape LIKE wildcards so user input only ever matches literally"""
+    return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def fuzzy_match(column, term):
+    """
+    Return (condition, score) for a typo-tolerant match of `term` against `column`.
+
+    The condition accepts a plain substring match or a pg_trgm word similarity
+    match ("Nakru" finds "Nakuru County"); both operators are served by a
+    gin_trgm_ops index on the column. The score orders the best matches first.
+    """
+    condition = db.or_(
+        column.ilike(f"%{escape_like(term)}%", escape='\\'),
+        column.op('%>')(term),
+    )
+    score = db.func.word_similarity(term, column)
+    return condition, score
@@ -0,0 +1,120 @@
+import math
+
+from config.config import db
+
+EARTH_RADIUS_KM = 6371.0088
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 9
+
+# Upper bound on the number of geohash prefixes a single bbox query ORs together
+MAX_COVER_CELLS = 32
+
+
+def valid_coordinates(latitude, longitude):
+    return -90.0 <= latitude <= 90.0 and -180.0 <= longitude <= 180.0
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Encode a point as a geohash string of the given length"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        rng, value = (lon_range, longitude) if even else (lat_range, latitude)
+        mid = (rng[0] + rng[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def geohash_cell_size(precision):
+    """Return the (height, width) in degrees of a geohash cell"""
+    lon_bits = math.ceil(precision * 5 / 2)
+    lat_bits = math.floor(precision * 5 / 2)
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+
+def geohash_cover(min_lat, min_lon, max_lat, max_lon):
+    """
+    Return the geohash prefixes whose cells together cover the bounding box.
+
+    Picks the longest prefix length that needs at most MAX_COVER_CELLS cells, so
+    a small box is answered by a few narrow index ranges and a large one by a
+    few wide ones.
+    """
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = geohash_cell_size(precision)
+        rows = math.floor(max_lat / height) - math.floor(min_lat / height) + 1
+        cols = math.floor(max_lon / width) - math.floor(min_lon / width) + 1
+        if rows * cols <= MAX_COVER_CELLS:
+            break
+
+    cells = set()
+    lat = min_lat
+    while True:
+        lon = min_lon
+        while True:
+            cells.add(encode_geohash(lat, lon, precision))
+            if lon >= max_lon:
+                break
+            lon = min(lon + width, max_lon)
+        if lat >= max_lat:
+            break
+        lat = min(lat + height, max_lat)
+    return sorted(cells)
+
+
+def bbox_around(latitude, longitude, radius_km):
+    """Return (min_lat, min_lon, max_lat, max_lon) enclosing a circle"""
+    dlat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    cos_lat = math.cos(math.radians(latitude))
+    dlon = 180.0 if cos_lat < 1e-6 else min(180.0, dlat / cos_lat)
+    return (max(-90.0, latitude - dlat), max(-180.0, longitude - dlon),
+            min(90.0, latitude + dlat), min(180.0, longitude + dlon))
+
+
+def parse_bbox(value):
+    """Parse "min_lon,min_lat,max_lon,max_lat" into (min_lat, min_lon, max_lat, max_lon)"""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(part) for part in value.split(','))
+    except (AttributeError, ValueError):
+        raise ValueError('bbox must be min_lon,min_lat,max_lon,max_lat')
+    if not (valid_coordinates(min_lat, min_lon) and valid_coordinates(max_lat, max_lon)):
+        raise ValueError('bbox is out of range')
+    if min_lat > max_lat or min_lon > max_lon:
+        raise ValueError('bbox minimums must not exceed maximums')
+    return min_lat, min_lon, max_lat, max_lon
+
+
+def within_bbox(lat_col, lon_col, geohash_col, min_lat, min_lon, max_lat, max_lon):
+    """SQL condition for points inside the box, led by indexed geohash prefix ranges"""
+    cells = geohash_cover(min_lat, min_lon, max_lat, max_lon)
+    return db.and_(
+        db.or_(*[geohash_col.like(cell + '%') for cell in cells]),
+        lat_col.between(min_lat, max_lat),
+        lon_col.between(min_lon, max_lon),
+    )
+
+
+def distance_km(lat_col, lon_col, latitude, longitude):
+    """SQL expression for the haversine distance from a point to each row"""
+    dlat = db.func.radians(lat_col - latitude)
+    dlon = db.func.radians(lon_col - longitude)
+    a = (db.func.power(db.func.sin(dlat / 2), 2) +
+         math.cos(math.radians(latitude)) * db.func.cos(db.func.radians(lat_col)) *
+         db.func.power(db.func.sin(dlon / 2), 2))
+    return 2 * EARTH_RADIUS_KM * db.func.asin(db.func.sqrt(db.func.least(1.0, a)))
@@ -0,0 +1,61 @@
+"""
+gevent worker support (GUNICORN_WORKER_CLASS=gevent).
+
+gunicorn monkey-patches the standard library as each gevent worker starts,
+which makes sockets, locks and threads cooperative, but not psycopg2: libpq
+waits for the server in C and would stop every greenlet of the worker for
+the length of each query. patch_worker() installs a wait callback that
+hands those waits to the gevent hub, as psycogreen does, and rebuilds the
+connection pools, which the preloaded app created before the patch with
+real locks: a greenlet waiting for a connection on one of those would
+block the greenlets that are about to return theirs.
+
+CPU-bound work must not run on the hub either. thread_pool() gives real OS
+threads under gevent, where concurrent.futures would start greenlets.
+"""
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+from psycopg2 import extensions
+
+
+def gevent_patched():
+    """True in a process whose threading module gevent has patched"""
+    monkey = sys.modules.get('gevent.monkey')
+    return monkey is not None and monkey.is_module_patched('threading')
+
+
+def thread_pool(max_workers, thread_name_prefix=''):
+    """An executor on OS threads; under gevent, waiting for its futures only blocks the calling greenlet"""
+    if gevent_patched():
+        from gevent.threadpool import ThreadPoolExecutor as NativeThreadPoolExecutor
+        return NativeThreadPoolExecutor(max_workers)
+    return ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+
+
+def wait_callback(connection, timeout=None):
+    """psycopg2 wait callback that yields to the gevent hub until the server is ready"""
+    from gevent.socket import wait_read, wait_write
+    while True:
+        state = connection.poll()
+        if state == extensions.POLL_OK:
+            return
+        if state == extensions.POLL_READ:
+            wait_read(connection.fileno(), timeout=timeout)
+        elif state == extensions.POLL_WRITE:
+            wait_write(connection.fileno(), timeout=timeout)
+        else:
+            raise psycopg2.OperationalError(f"Bad result from poll: {state!r}")
+
+
+def patch_worker(app):
+    """Make psycopg2 and the app's connection pools cooperative, in a freshly patched gevent worker"""
+    if not gevent_patched():
+        raise RuntimeError("patch_worker() needs gevent's monkey patching applied first")
+    extensions.set_wait_callback(wait_callback)
+    from config.config import db
+    with app.app_context():
+        for engine in db.engines.values():
+            # The new pool's queue is built from the patched threading module
+            engine.dispose(close=False)
@@ -0,0 +1,205 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from functools import partial
+
+from flask import current_app
+from sqlalchemy.dialects.postgresql import insert
+
+from config.config import db, cache
+from models.models import IMAGE_VARIANT_FORMATS, ImageBlob, livestock
+from utils.metrics import metrics
+from utils.thumbnails import render_variants, variant_path
+from utils.uploads import allowed_image_types, sniff_image_type
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def stored_path(name):
+    """Sharded location of a stored file named <sha256>[_<width>].<ext>: UPLOAD_FOLDER/ab/cd/<name>"""
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], name[:2], name[2:4], name)
+
+
+def blob_path(sha256, image_type):
+    """Sharded location of a blob: UPLOAD_FOLDER/ab/cd/abcd....<type>"""
+    return stored_path(f"{sha256}.{image_type}")
+
+
+def image_url(sha256, image_type):
+    return f"/images/{sha256}.{image_type}"
+
+
+def store_upload(stream, image_type):
+    """
+    Move a finished HashingFileStream into the content-addressed store.
+
+    Identical bytes always land on the same path, so a re-upload just drops its
+    temp file. The blob row is created (or touched) with no references; the
+    caller attaches it to a listing in the same transaction.
+    """
+    sha256 = stream.hexdigest()
+    statement = insert(ImageBlob).values(
+        sha256=sha256, image_type=image_type, size=stream.size, ref_count=0
+    )
+    # Touching updated_at keeps a zero-reference blob out of the GC grace window.
+    # The upsert comes first: it holds the row lock until commit, and waits for
+    # a collect_garbage() that is deleting this blob to unlink its file, so the
+    # file is moved in after the GC is done with it
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=[ImageBlob.sha256], set_={'updated_at': db.func.now()}
+    ))
+
+    path = blob_path(sha256, image_type)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    stream.move_to(path)
+    return sha256
+
+
+def _change_refs(sha256, delta):
+    db.session.execute(
+        db.update(ImageBlob)
+        .where(ImageBlob.sha256 == sha256)
+        .values(ref_count=ImageBlob.ref_count + delta, updated_at=db.func.now())
+    )
+
+
+def attach_image(item, sha256, image_type):
+    """Point a listing at a stored blob, moving one reference from its old image"""
+    if item.image_sha256 == sha256:
+        return
+    _change_refs(sha256, 1)
+    if item.image_sha256 is not None:
+        _change_refs(item.image_sha256, -1)
+    item.image_sha256 = sha256
+    item.image_url = image_url(sha256, image_type)
+
+
+def save_listing_image(item, stream):
+    """
+    Store a finished upload as `item`'s image, commit, and queue its variants.
+
+    Returns False, having discarded the file, when the bytes are not an
+    allowed image type.
+    """
+    image_type = sniff_image_type(stream.head)
+    if image_type not in allowed_image_types():
+        stream.discard()
+        return False
+
+    sha256 = store_upload(stream, image_type)
+    attach_image(item, sha256, image_type)
+    db.session.commit()
+    cache.invalidate("livestock")
+
+    # A re-upload of a known image already has its variants
+    if item.image.variant_widths is None:
+        schedule_variants(sha256, image_type)
+    return True
+
+
+def get_variant_executor():
+    """
+    Process pool for rendering variants, created on first use in each process.
+
+    Children are spawned rather than forked so they never inherit a worker's
+    threads, locks or database connections.
+    """
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = ProcessPoolExecutor(
+                max_workers=current_app.config['THUMBNAIL_WORKERS'],
+                mp_context=multiprocessing.get_context('spawn')
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def schedule_variants(sha256, image_type):
+    """Render a blob's responsive variants in the background"""
+    app = current_app._get_current_object()
+    future = get_variant_executor().submit(
+        render_variants, blob_path(sha256, image_type),
+        app.config['IMAGE_VARIANT_WIDTHS'], IMAGE_VARIANT_FORMATS
+    )
+    future.add_done_callback(partial(_variants_done, app, sha256, time.perf_counter()))
+    return future
+
+
+def _variants_done(app, sha256, started, future):
+    # Runs on the executor's management thread, outside any request
+    metrics.observe('thumbnails.render', time.perf_counter() - started)
+    try:
+        widths = future.result()
+    except Exception:
+        metrics.incr('thumbnails.failed')
+        app.logger.exception("Rendering variants for %s failed", sha256)
+        return
+
+    with app.app_context():
+        db.session.execute(
+            db.update(ImageBlob)
+            .where(ImageBlob.sha256 == sha256)
+            .values(variant_widths=','.join(str(w) for w in widths))
+        )
+        db.session.commit()
+        # Listing payloads carry the srcset
+        cache.invalidate("livestock")
+    metrics.incr('thumbnails.rendered')
+
+
+def collect_garbage(retention_days, grace_seconds, batch_size=500):
+    """
+    Release images of listings soft-deleted more than `retention_days` ago, then
+    delete unreferenced blobs untouched for `grace_seconds`.
+
+    Returns (released, deleted) counts.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    released = 0
+    while True:
+        items = (livestock.query
+                 .filter(livestock.is_deleted == db.true(),
+                         livestock.deleted_at < cutoff,
+                         livestock.image_sha256.isnot(None))
+                 .order_by(livestock.id)
+                 .limit(batch_size).all())
+        if not items:
+            break
+        for item in items:
+            _change_refs(item.image_sha256, -1)
+            item.image_sha256 = None
+            # The URL points at the released file, which may be deleted below
+            item.image_url = ''
+        released += len(items)
+        db.session.commit()
+
+    # The files are unlinked while the DELETE still holds the rows' locks. An
+    # upload of the same bytes blocks in store_upload() until the commit, then
+    # inserts a fresh row and moves its file into place; one that touched the
+    # row first makes it too recent and the DELETE skips it. updated_at is the
+    # server's now(), so the grace window is measured on the same clock
+    stale = db.func.now() - timedelta(seconds=grace_seconds)
+    victims = db.session.execute(
+        db.delete(ImageBlob)
+        .where(ImageBlob.ref_count <= 0, ImageBlob.updated_at < stale)
+        .returning(ImageBlob.sha256, ImageBlob.image_type, ImageBlob.variant_widths)
+    ).all()
+    for sha256, image_type, variant_widths in victims:
+        path = blob_path(sha256, image_type)
+        for width in (variant_widths or '').split(','):
+            if not width:
+                continue
+            for fmt in IMAGE_VARIANT_FORMATS:
+                variant = variant_path(path, width, fmt)
+                if os.path.exists(variant):
+                    os.remove(variant)
+        if os.path.exists(path):
+            os.remove(path)
+    db.session.commit()
+    return released, len(victims)
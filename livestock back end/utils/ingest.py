@@ -0,0 +1,27 @@
+from psycopg2.extras import execute_values
+
+from config.config import db
+
+# Column order of the multi-row INSERT; values come from parse_listing()
+LISTING_COLUMNS = ('livestock', 'breed', 'phone', 'image_url', 'description', 'location',
+                   'latitude', 'longitude', 'geohash', 'farmer_id', 'is_active', 'is_deleted')
+
+
+def bulk_insert_listings(rows, page_size=1000):
+    """
+    Insert validated listing rows with psycopg2's execute_values.
+
+    Runs on the session's connection, so the insert joins the current
+    transaction; the caller commits. Returns the new ids in input order.
+    """
+    values = [
+        tuple(row.get(column) for column in LISTING_COLUMNS[:-2]) + (True, False)
+        for row in rows
+    ]
+    sql = f"INSERT INTO livestock ({', '.join(LISTING_COLUMNS)}) VALUES %s RETURNING id"
+    cursor = db.session.connection().connection.cursor()
+    try:
+        returned = execute_values(cursor, sql, values, page_size=page_size, fetch=True)
+    finally:
+        cursor.close()
+    return [row[0] for row in returned]
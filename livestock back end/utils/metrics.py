@@ -0,0 +1,62 @@
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+# Samples kept per timer for percentile estimates
+TIMER_WINDOW = 1024
+
+
+class Metrics:
+    """Thread-safe, per-process counters and timers, reported by GET /metrics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = defaultdict(int)
+        self._timers = {}
+
+    def incr(self, name, value=1):
+        with self._lock:
+            self._counters[name] += value
+
+    def observe(self, name, seconds):
+        with self._lock:
+            timer = self._timers.get(name)
+            if timer is None:
+                timer = self._timers[name] = {
+                    'count': 0, 'total': 0.0, 'max': 0.0,
+                    'samples': deque(maxlen=TIMER_WINDOW)
+                }
+            timer['count'] += 1
+            timer['total'] += seconds
+            timer['max'] = max(timer['max'], seconds)
+            timer['samples'].append(seconds)
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self):
+        """Return counters and timer summaries (milliseconds) as plain dicts"""
+        with self._lock:
+            counters = dict(self._counters)
+            timers = {name: dict(t, samples=sorted(t['samples'])) for name, t in self._timers.items()}
+
+        summaries = {}
+        for name, t in timers.items():
+            samples = t['samples']
+            summaries[name] = {
+                'count': t['count'],
+                'avg_ms': t['total'] / t['count'] * 1000,
+                'p50_ms': samples[len(samples) // 2] * 1000,
+                'p95_ms': samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000,
+                'max_ms': t['max'] * 1000
+            }
+        return {'counters': counters, 'timers': summaries}
+
+
+metrics = Metrics()
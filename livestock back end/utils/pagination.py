@@ -0,0 +1,113 @@
+import base64
+import json
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import tuple_
+
+
+class CursorError(ValueError):
+    """Raised when a pagination cursor cannot be decoded"""
+
+
+def encode_cursor(*values):
+    """Pack the sort key of the last row into an opaque, URL-safe token"""
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Unpack a cursor produced by encode_cursor into its list of values"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        raise CursorError('Invalid cursor')
+    if not isinstance(values, list):
+        raise CursorError('Invalid cursor')
+    return values
+
+
+def get_limit(args):
+    """Read ?limit= from the request args, clamped to the configured maximum"""
+    default = current_app.config['PAGE_SIZE']
+    maximum = current_app.config['MAX_PAGE_SIZE']
+    try:
+        limit = int(args.get('limit', default))
+    except (TypeError, ValueError):
+        raise CursorError('limit must be an integer')
+    if limit < 1:
+        raise CursorError('limit must be positive')
+    return min(limit, maximum)
+
+
+def keyset_query(query, created_col, id_col, cursor=None, limit=50):
+    """Apply the keyset cursor, order and limit (plus one look-ahead row) to `query`"""
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 2:
+            raise CursorError('Invalid cursor')
+        try:
+            after_created = datetime.fromisoformat(values[0])
+            after_id = int(values[1])
+        except (TypeError, ValueError):
+            raise CursorError('Invalid cursor')
+        query = query.filter(tuple_(created_col, id_col) < tuple_(after_created, after_id))
+    return query.order_by(created_col.desc(), id_col.desc()).limit(limit + 1)
+
+
+def keyset_page(query, created_col, id_col, cursor=None, limit=50):
+    """
+    Return one page of `query` ordered newest first by (created_at, id).
+
+    The cursor is the (created_at, id) of the last row of the previous page,
+    so each page is a range scan on the matching index no matter how deep it is.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    rows = keyset_query(query, created_col, id_col, cursor, limit).all()
+    return keyset_result(rows, created_col, id_col, limit)
+
+
+def keyset_result(rows, created_col, id_col, limit):
+    """Split the look-ahead row off rows fetched with keyset_query into (rows, next_cursor)"""
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, created_col.key), getattr(last, id_col.key))
+    return rows, next_cursor
+
+
+def ranked_page(query, rank, id_col, cursor=None, limit=50, descending=True):
+    """
+    Return one page of `query` ordered by (rank, id), best match first.
+
+    `rank` is a SQL expression added to the selected columns, so rows come back
+    as (entity, rank) pairs. The cursor carries the rank and id of the last row.
+    Pass descending=False for scores where lower is better, such as distance.
+    """
+    query = query.add_columns(rank)
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != 2:
+            raise CursorError('Invalid cursor')
+        try:
+            after_rank = float(values[0])
+            after_id = int(values[1])
+        except (TypeError, ValueError):
+            raise CursorError('Invalid cursor')
+        after = tuple_(after_rank, after_id)
+        query = query.filter(tuple_(rank, id_col) < after if descending else tuple_(rank, id_col) > after)
+
+    if descending:
+        query = query.order_by(rank.desc(), id_col.desc())
+    else:
+        query = query.order_by(rank.asc(), id_col.asc())
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last, last_rank = rows[-1]
+        next_cursor = encode_cursor(last_rank, getattr(last, id_col.key))
+    return rows, next_cursor
@@ -0,0 +1,81 @@
+import os
+import threading
+import time
+
+import bcrypt
+
+from utils.green import thread_pool
+from utils.metrics import metrics
+
+
+class HasherBusy(Exception):
+    """The bcrypt queue is full; the caller should shed the request"""
+
+
+class PasswordHasher:
+    """
+    bcrypt on a small, dedicated thread pool.
+
+    bcrypt releases the GIL while it works, so BCRYPT_WORKERS threads use at
+    most that many cores no matter how many requests are logging in; the rest
+    of the app keeps its share of the CPU. At most BCRYPT_MAX_QUEUE operations
+    may be running or waiting, beyond that callers get HasherBusy at once
+    instead of queueing behind a burst.
+    """
+
+    def __init__(self, app=None):
+        self.rounds = 12
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.rounds = app.config['BCRYPT_ROUNDS']
+        self.workers = app.config['BCRYPT_WORKERS']
+        self._slots = threading.BoundedSemaphore(app.config['BCRYPT_MAX_QUEUE'])
+
+    def _get_executor(self):
+        # Created on first use in each process, so a forked worker never
+        # inherits the parent's threads
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                # OS threads even in a gevent worker, so hashing never stalls its hub
+                self._executor = thread_pool(self.workers, thread_name_prefix='bcrypt')
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _run(self, name, fn, *args):
+        if not self._slots.acquire(blocking=False):
+            metrics.incr('bcrypt.rejected')
+            raise HasherBusy()
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            return started, fn(*args), time.perf_counter()
+
+        try:
+            started, result, finished = self._get_executor().submit(timed).result()
+        finally:
+            self._slots.release()
+        # Recorded here rather than on the pool thread, which must not touch
+        # locks created after gevent patched threading
+        metrics.observe('bcrypt.queue', started - submitted)
+        metrics.observe(f'bcrypt.{name}', finished - started)
+        return result
+
+    def hash(self, password):
+        salt = bcrypt.gensalt(rounds=self.rounds)
+        return self._run('hash', bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+    def check(self, password, password_hash):
+        return self._run('check', bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    def needs_rehash(self, password_hash):
+        """True when a stored hash was made with a different BCRYPT_ROUNDS"""
+        try:
+            return int(password_hash.split('$')[2]) != self.rounds
+        except (IndexError, ValueError):
+            return True
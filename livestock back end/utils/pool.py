@@ -0,0 +1,123 @@
+import os
+import time
+import uuid
+
+from sqlalchemy import event, exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from utils.metrics import metrics
+
+
+class _TimedCheckout:
+    """Reports how long each checkout waited, including opening new connections"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            metrics.incr('db.pool.timeouts')
+            raise
+        finally:
+            metrics.observe('db.pool.checkout', time.perf_counter() - start)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+
+def engine_options(config):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS for the DB_POOL_* and DB_STATEMENT_TIMEOUT settings.
+
+    With DB_PGBOUNCER on, connections are shared between clients per
+    transaction, so nothing may outlive a transaction on the server side:
+    the statement timeout is not sent as a startup parameter (PgBouncer
+    rejects those) but set with SET LOCAL by statement_timeout_listener.
+    psycopg2 never prepares statements on the server, so there is no
+    prepared statement cache to switch off.
+    """
+    options = {
+        'poolclass': TimedQueuePool,
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+        # Never hand a connection back to the pool inside an open transaction
+        'pool_reset_on_return': 'rollback',
+    }
+    timeout = config['DB_STATEMENT_TIMEOUT']
+    if timeout and not config['DB_PGBOUNCER']:
+        options['connect_args'] = {'options': f"-c statement_timeout={timeout}"}
+    return options
+
+
+def async_engine_options(config):
+    """
+    engine_options() for the asyncpg engine of utils.async_db.
+
+    asyncpg takes the statement timeout as a server setting. It prepares
+    every statement on the server and caches them per connection, which
+    breaks under PgBouncer in transaction mode: the next transaction may
+    run on a server connection that never saw the statement. With
+    DB_PGBOUNCER on, both caches are off and each statement gets a unique
+    name, and the timeout is set per transaction as for psycopg2.
+    """
+    options = dict(engine_options(config), poolclass=TimedAsyncQueuePool)
+    options.pop('connect_args', None)
+    timeout = config['DB_STATEMENT_TIMEOUT']
+    if config['DB_PGBOUNCER']:
+        options['connect_args'] = {
+            'statement_cache_size': 0,
+            'prepared_statement_cache_size': 0,
+            'prepared_statement_name_func': lambda: f"__asyncpg_{uuid.uuid4()}__",
+        }
+    elif timeout:
+        options['connect_args'] = {'server_settings': {'statement_timeout': str(timeout)}}
+    return options
+
+
+def instrument_engine(engine, config):
+    """Count connections opened and discarded, and set the statement timeout per transaction under PgBouncer"""
+    event.listen(engine, 'connect', lambda *args: metrics.incr('db.pool.connects'))
+    event.listen(engine, 'invalidate', lambda *args: metrics.incr('db.pool.invalidated'))
+    timeout = config['DB_STATEMENT_TIMEOUT']
+    if timeout and config['DB_PGBOUNCER']:
+        event.listen(engine, 'begin', statement_timeout_listener(timeout))
+
+
+def dispose_after_fork(engines):
+    """Give forked children (preloaded gunicorn workers) fresh pools instead of the parent's connections"""
+    engines = list(engines)
+
+    def dispose():
+        for engine in engines:
+            # close=False leaves the parent's sockets alone; the child just forgets them
+            engine.dispose(close=False)
+    os.register_at_fork(after_in_child=dispose)
+
+
+def statement_timeout_listener(timeout):
+    statement = f"SET LOCAL statement_timeout = {int(timeout)}"
+
+    def set_timeout(connection):
+        connection.exec_driver_sql(statement)
+    return set_timeout
+
+
+def pool_status(engine):
+    """Current size and usage of an engine's pool, for GET /metrics"""
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {}
+    return {
+        'size': pool.size(),
+        'checked_out': pool.checkedout(),
+        'idle': pool.checkedin(),
+        'overflow': max(pool.overflow(), 0),
+    }
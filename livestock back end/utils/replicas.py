@@ -0,0 +1,205 @@
+"""
+Read replica routing.
+
+GET and HEAD requests to blueprints passed to route_reads() read from a
+replica bind; everything else, and every flush, uses the primary. A request
+reads from the primary instead when:
+
+- the same user (JWT identity) wrote within DB_REPLICA_STICKY_SECONDS
+  (read-your-writes). The mark is kept in the response cache backend, which
+  must be shared by the workers (CACHE_BACKEND=sqlite) for any worker to see
+  it, so init_app() refuses replicas with stickiness on any other backend,
+- the response is about to be stored in the shared response cache, so a
+  lagging replica never fills it with data older than a write that just
+  invalidated it,
+- no replica is healthy: each is checked at most every
+  DB_REPLICA_CHECK_INTERVAL seconds and skipped while its replay lag is over
+  DB_REPLICA_MAX_LAG or it cannot be reached.
+
+Any SQLAlchemy URL works as a replica, so a second local database is
+enough to try it out; replicas that are not Postgres are never lagging.
+"""
+import random
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+
+from utils.metrics import metrics
+
+READ_METHODS = ('GET', 'HEAD')
+WRITE_METHODS = ('POST', 'PUT', 'PATCH', 'DELETE')
+# Seconds to wait for a replica connection before treating it as down
+CONNECT_TIMEOUT = 2
+
+# Replay lag in seconds; 0 when the replica has replayed everything it received
+LAG_QUERY = text("""
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+    END
+""")
+
+
+def replica_binds(uris, engine_options):
+    """SQLALCHEMY_BINDS entries replica0, replica1, ... for the given database URIs"""
+    binds = {}
+    for i, uri in enumerate(uris):
+        if uri.startswith('postgresql'):
+            options = dict(engine_options)
+            options['connect_args'] = dict(options.get('connect_args', {}), connect_timeout=CONNECT_TIMEOUT)
+        else:
+            options = {}
+        binds[f'replica{i}'] = dict(options, url=uri)
+    return binds
+
+
+def use_primary():
+    """Send the rest of this request's reads to the primary"""
+    if has_request_context():
+        g.read_bind = None
+
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that sends reads to the replica chosen for the request"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if self._flushing:
+            # Reads after a write in the same request must see it
+            use_primary()
+        elif bind is None and not getattr(clause, 'is_dml', False):
+            engine = current_app.extensions['replicas'].read_engine()
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ReplicaRouter:
+    def __init__(self, app=None):
+        self._status = {}  # bind key -> (healthy, checked_at, lag)
+        self._lock = threading.Lock()
+        self._sticky_store = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.sticky_seconds = app.config['DB_REPLICA_STICKY_SECONDS']
+        self.max_lag = app.config['DB_REPLICA_MAX_LAG']
+        self.check_interval = app.config['DB_REPLICA_CHECK_INTERVAL']
+        self.keys = [key for key in app.config.get('SQLALCHEMY_BINDS', {}) if key.startswith('replica')]
+        if self.keys and self.sticky_seconds:
+            # A write served by one worker must pin reads served by every other
+            backend = app.extensions['response_cache'].backend
+            if backend is None or not backend.shared:
+                raise ValueError("DB_REPLICA_URIS with DB_REPLICA_STICKY_SECONDS needs a shared "
+                                 "CACHE_BACKEND (sqlite) to keep read-your-writes across workers")
+            self._sticky_store = backend
+        db = app.extensions['sqlalchemy']
+        with app.app_context():
+            for key in self.keys:
+                event.listen(db.engines[key], 'handle_error', self._connection_failed(key))
+        app.before_request(self._reset)
+        app.after_request(self._after_request)
+        app.extensions['replicas'] = self
+
+    def route_reads(self, blueprint):
+        """Read from a replica in the GET and HEAD handlers of `blueprint`"""
+        blueprint.before_request(self._mark_read)
+
+    def stick(self, identity):
+        """Read from the primary for this user's requests in the next DB_REPLICA_STICKY_SECONDS"""
+        if identity is not None and self._sticky_store is not None:
+            self._sticky_store.set(f"replica-sticky:{identity}", b'1', self.sticky_seconds)
+
+    def read_engine(self):
+        """The replica engine this request reads from, or None for the primary"""
+        if not has_request_context():
+            return None
+        if 'read_bind' not in g:
+            g.read_bind = self._choose() if g.get('read_replica') else None
+        key = g.read_bind
+        return None if key is None else current_app.extensions['sqlalchemy'].engines[key]
+
+    def status(self):
+        """Last known health and lag of each replica, for GET /metrics"""
+        with self._lock:
+            return {key: {'healthy': healthy, 'lag_seconds': lag}
+                    for key, (healthy, _, lag) in self._status.items()}
+
+    def _reset(self):
+        # g outlives the request when an app context was pushed around it
+        g.pop('read_replica', None)
+        g.pop('read_bind', None)
+
+    def _mark_read(self):
+        if request.method in READ_METHODS and self.keys:
+            g.read_replica = True
+
+    def _choose(self):
+        if self._sticky():
+            metrics.incr('db.reads.sticky')
+            return None
+        healthy = [key for key in self.keys if self._healthy(key)]
+        if not healthy:
+            metrics.incr('db.reads.fallback')
+            return None
+        metrics.incr('db.reads.replica')
+        return random.choice(healthy)
+
+    def _healthy(self, key):
+        now = time.monotonic()
+        with self._lock:
+            healthy, checked_at, lag = self._status.get(key, (True, None, None))
+            if checked_at is not None and now - checked_at < self.check_interval:
+                return healthy
+            # Claim the check so concurrent requests keep using the last result
+            self._status[key] = (healthy, now, lag)
+        lag = self._measure_lag(key)
+        healthy = lag is not None and lag <= self.max_lag
+        if not healthy:
+            metrics.incr('db.replica.unhealthy')
+        with self._lock:
+            self._status[key] = (healthy, now, lag)
+        return healthy
+
+    def _measure_lag(self, key):
+        engine = current_app.extensions['sqlalchemy'].engines[key]
+        try:
+            with engine.connect() as connection:
+                if engine.dialect.name != 'postgresql':
+                    connection.execute(text("SELECT 1"))
+                    return 0.0
+                return float(connection.execute(LAG_QUERY).scalar())
+        except Exception:
+            return None
+
+    def _connection_failed(self, key):
+        def mark_down(context):
+            if context.is_disconnect or context.connection is None:
+                # Stay on the primary until the next check finds it back
+                with self._lock:
+                    self._status[key] = (False, time.monotonic(), None)
+        return mark_down
+
+    def _sticky(self):
+        if self._sticky_store is None:
+            return False
+        identity = _identity()
+        return identity is not None and self._sticky_store.get(f"replica-sticky:{identity}") is not None
+
+    def _after_request(self, response):
+        if request.method in WRITE_METHODS and response.status_code < 400:
+            self.stick(_identity())
+        return response
+
+
+def _identity():
+    try:
+        verify_jwt_in_request(optional=True)
+        return get_jwt_identity()
+    except Exception:
+        return None
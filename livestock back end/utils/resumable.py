@@ -0,0 +1,143 @@
+"""
+Resumable image uploads, following the tus 1.0 core protocol.
+
+Each upload is a partial file and a JSON .info file under
+UPLOAD_FOLDER/.partial, so any worker can append to it and the offset is
+simply the partial file's size. A PATCH holds an exclusive flock on the
+partial file; the sweeper removes uploads whose partial file has not been
+written for RESUMABLE_UPLOAD_EXPIRY seconds.
+"""
+import fcntl
+import json
+import os
+import re
+import secrets
+import time
+from contextlib import contextmanager
+
+from flask import current_app
+
+from utils.uploads import HashingFileStream
+
+UPLOAD_ID = re.compile(r'^[0-9a-f]{32}$')
+CHUNK_SIZE = 64 * 1024
+
+
+class UploadLocked(Exception):
+    """Another request is appending to the same upload"""
+
+
+def partial_dir():
+    return os.path.join(current_app.config['UPLOAD_FOLDER'], '.partial')
+
+
+def _paths(upload_id):
+    base = os.path.join(partial_dir(), upload_id)
+    return base + '.part', base + '.info'
+
+
+def create_upload(livestock_id, user_id, length):
+    """Start an empty upload of `length` bytes and return its id"""
+    os.makedirs(partial_dir(), exist_ok=True)
+    upload_id = secrets.token_hex(16)
+    partial, info = _paths(upload_id)
+    open(partial, 'xb').close()
+    temp = info + '.tmp'
+    with open(temp, 'w') as f:
+        json.dump({'livestock_id': livestock_id, 'user_id': user_id, 'length': length}, f)
+    os.replace(temp, info)
+    return upload_id
+
+
+def load_upload(upload_id):
+    """The upload's info with its current offset and expiry time, or None"""
+    if not UPLOAD_ID.match(upload_id):
+        return None
+    partial, info = _paths(upload_id)
+    try:
+        with open(info) as f:
+            upload = json.load(f)
+        stat = os.stat(partial)
+    except FileNotFoundError:
+        return None
+    upload['offset'] = stat.st_size
+    upload['expires'] = stat.st_mtime + current_app.config['RESUMABLE_UPLOAD_EXPIRY']
+    return upload
+
+
+@contextmanager
+def locked_partial(upload_id):
+    """Open the partial file for appending under an exclusive, non-blocking lock"""
+    partial, _ = _paths(upload_id)
+    with open(partial, 'ab') as f:
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            raise UploadLocked(upload_id)
+        yield f
+
+
+def append_chunk(partial, source, length):
+    """
+    Copy a request body onto the partial file, returning the new offset.
+
+    Bytes are flushed as they arrive, so a connection dropped mid-chunk keeps
+    everything received before it. A body that would run past `length` is
+    rolled back and rejected.
+    """
+    start = partial.tell()
+    offset = start
+    while True:
+        data = source.read(CHUNK_SIZE)
+        if not data:
+            return offset
+        if offset + len(data) > length:
+            partial.truncate(start)
+            raise ValueError("Chunk runs past Upload-Length")
+        partial.write(data)
+        partial.flush()
+        offset += len(data)
+
+
+def finish_upload(upload_id):
+    """Hand a complete upload over as a HashingFileStream for the image store"""
+    partial, info = _paths(upload_id)
+    stream = HashingFileStream.adopt(partial)
+    os.remove(info)
+    return stream
+
+
+def remove_upload(upload_id):
+    for path in _paths(upload_id):
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def sweep_uploads(max_age):
+    """
+    Remove uploads not written to for `max_age` seconds, plus multipart temp
+    files a crashed worker left in UPLOAD_FOLDER. Returns the number of files
+    removed.
+    """
+    cutoff = time.time() - max_age
+    removed = 0
+    stale = []
+    if os.path.isdir(partial_dir()):
+        stale += [os.path.join(partial_dir(), name) for name in os.listdir(partial_dir())]
+    folder = current_app.config['UPLOAD_FOLDER']
+    stale += [os.path.join(folder, name) for name in os.listdir(folder) if name.startswith('.upload-')]
+
+    for path in stale:
+        # An .info file expires with its partial file
+        activity = path[:-len('.info')] + '.part' if path.endswith('.info') else path
+        try:
+            if os.stat(activity).st_mtime >= cutoff:
+                continue
+        except FileNotFoundError:
+            pass
+        try:
+            os.remove(path)
+            removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
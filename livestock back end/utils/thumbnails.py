@@ -0,0 +1,45 @@
+"""
+Responsive image variants, rendered in worker processes.
+
+Nothing here touches Flask or the database: render_variants runs inside a
+ProcessPoolExecutor child started with the "spawn" method, so it must only
+depend on Pillow and the arguments it is given.
+"""
+import os
+
+from PIL import Image, ImageOps
+
+VARIANT_FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def variant_path(source_path, width, fmt):
+    """Path of one variant next to its source: <sha256>_<width>.<fmt>"""
+    base, _ = os.path.splitext(source_path)
+    return f"{base}_{width}.{fmt}"
+
+
+def render_variants(source_path, widths, formats=('webp', 'jpeg')):
+    """
+    Write each requested width (never upscaled) in each format next to the source.
+
+    Returns the widths actually written; an image narrower than every requested
+    width gets a single variant at its own width.
+    """
+    with Image.open(source_path) as image:
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+
+        targets = sorted(w for w in widths if w < image.width) or [image.width]
+        for width in targets:
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.LANCZOS)
+            for fmt in formats:
+                destination = variant_path(source_path, width, fmt)
+                temp = destination + '.tmp'
+                resized.save(temp, **VARIANT_FORMATS[fmt])
+                os.replace(temp, destination)
+        return targets
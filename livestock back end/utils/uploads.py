@@ -0,0 +1,124 @@
+import hashlib
+import os
+import tempfile
+
+from flask import Request, current_app
+
+# Leading bytes of each accepted image format
+IMAGE_SIGNATURES = (
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+
+# ALLOWED_EXTENSIONS entries that name the same format
+FORMAT_EXTENSIONS = {'png': 'png', 'jpg': 'jpeg', 'jpeg': 'jpeg', 'gif': 'gif'}
+
+HEAD_BYTES = 16
+
+
+def sniff_image_type(head):
+    """Return the image format for the file's first bytes, or None"""
+    for signature, image_type in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return image_type
+    return None
+
+
+def allowed_image_types():
+    return {FORMAT_EXTENSIONS[ext] for ext in current_app.config['ALLOWED_EXTENSIONS']
+            if ext in FORMAT_EXTENSIONS}
+
+
+class HashingFileStream:
+    """
+    Temp file in UPLOAD_FOLDER that hashes and sizes an upload as it is written.
+
+    Werkzeug's multipart parser writes each file part into this in chunks, so
+    an upload never sits in memory in full, and the SHA-256 and leading bytes
+    are known as soon as parsing finishes.
+    """
+
+    def __init__(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(prefix='.upload-', dir=directory)
+        self._file = os.fdopen(fd, 'w+b')
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self.head = b''
+
+    @classmethod
+    def adopt(cls, path, chunk_size=1024 * 1024):
+        """Wrap a file already written in UPLOAD_FOLDER, hashing it in one pass"""
+        stream = cls.__new__(cls)
+        stream.path = path
+        stream._file = open(path, 'rb')
+        stream._hash = hashlib.sha256()
+        stream.size = 0
+        stream.head = b''
+        for chunk in iter(lambda: stream._file.read(chunk_size), b''):
+            stream._account(chunk)
+        return stream
+
+    def _account(self, data):
+        self._hash.update(data)
+        if len(self.head) < HEAD_BYTES:
+            self.head += data[:HEAD_BYTES - len(self.head)]
+        self.size += len(data)
+
+    def write(self, data):
+        self._account(data)
+        return self._file.write(data)
+
+    def hexdigest(self):
+        return self._hash.hexdigest()
+
+    def seek(self, *args):
+        return self._file.seek(*args)
+
+    def tell(self):
+        return self._file.tell()
+
+    def read(self, *args):
+        return self._file.read(*args)
+
+    def flush(self):
+        self._file.flush()
+
+    def __getattr__(self, name):
+        # Anything else werkzeug asks of the stream goes to the real file
+        return getattr(self._file, name)
+
+    def close(self):
+        self._file.close()
+
+    def discard(self):
+        """Delete the temp file if it has not been moved into place"""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def move_to(self, destination):
+        """Move the finished upload to `destination`, keeping an existing identical file"""
+        self.close()
+        if os.path.exists(destination):
+            os.remove(self.path)
+        else:
+            os.replace(self.path, destination)
+
+
+class UploadRequest(Request):
+    """Request class that streams multipart file parts into HashingFileStream"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        stream = HashingFileStream(current_app.config['UPLOAD_FOLDER'])
+        self.__dict__.setdefault('_upload_streams', []).append(stream)
+        return stream
+
+    def close(self):
+        # Flask closes the request when the context is popped; drop any temp
+        # file a view did not move into place
+        super().close()
+        for stream in self.__dict__.get('_upload_streams', ()):
+            stream.discard()
@@ -0,0 +1,8 @@
+# Production entry point, served by gunicorn with gunicorn.conf.py:
+#
+#     gunicorn -c gunicorn.conf.py
+#
+# app.py stays the development server (python app.py).
+from config.config import create_app
+
+app = create_app()